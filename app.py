@@ -1,24 +1,164 @@
-from flask import Flask, render_template, request
-import numpy as np
-from scipy.optimize import root_scalar
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+from markupsafe import Markup
+import csv
+import io
+import itertools
+import json
 import logging
+import math
+import os
+from urllib.parse import urlencode
+
+from calculations.cache import QuoteCache, cache_key
+from calculations import metrics
+from calculations.discount import cache_stats as discount_cache_stats
+from calculations.lease import parse_lease_inputs, price_lease_batch
+from calculations import engine
+from calculations.engine import irr
+from calculations.fixedpoint import ROUNDING, price_quote_paise
+from calculations.goalseek import goal_seek
+from calculations.metrics import QUOTE_ERRORS, timed
+from calculations.quote import DEFAULT_INPUTS, contract_terms, iter_schedule_rows, parse_inputs, price_quote
+from calculations.schedule import COLUMNS
+from calculations.sensitivity import GRID_FIELDS, grid_json, iter_grid_rows, sensitivity_grid
+from calculations.simulation import simulate, summarize
+from calculations.store import QuoteStore
+from calculations.whatif import apply_event, whatif_from_inputs
+from calculations.xirr import schedule_xirr
 
 app = Flask(__name__)
 
 logging.basicConfig(level=logging.INFO)
 
-# === Financial Functions ===
+app.config['QUOTE_CACHE_SIZE'] = int(os.environ.get('QUOTE_CACHE_SIZE', 1024))
+app.config['QUOTE_CACHE_TTL'] = float(os.environ.get('QUOTE_CACHE_TTL', 300)) or None
+app.config['QUOTE_STORE_PATH'] = os.environ.get('QUOTE_STORE_PATH')
+# Schedule rows rendered inline on the page, the rest load on demand (0 = all)
+app.config['SCHEDULE_PAGE_SIZE'] = int(os.environ.get('SCHEDULE_PAGE_SIZE', 0))
+# Rendered schedule pages kept apart from the quote cache's arrays
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+app.config['QUOTE_WARMUP'] = os.environ.get('QUOTE_WARMUP', '').lower() in ('1', 'true', 'yes', 'on')
+app.config['PRELOAD_SOLVERS'] = os.environ.get('PRELOAD_SOLVERS', '').lower() in ('1', 'true', 'yes', 'on')
+# 'half_up' or 'half_even' prices quotes in exact integer paise (calculations.fixedpoint)
+app.config['FIXED_POINT_ROUNDING'] = os.environ.get('FIXED_POINT_ROUNDING', '').lower() or None
+if app.config['FIXED_POINT_ROUNDING'] not in (None,) + ROUNDING:
+    raise ValueError(f"FIXED_POINT_ROUNDING must be one of {', '.join(ROUNDING)}")
 
-def npv(rate, cashflows):
-    return sum(cf / (1 + rate) ** t for t, cf in enumerate(cashflows))
+quote_cache = QuoteCache(app.config['QUOTE_CACHE_SIZE'], app.config['QUOTE_CACHE_TTL'])
+fragment_cache = QuoteCache(app.config['FRAGMENT_CACHE_SIZE'], app.config['QUOTE_CACHE_TTL'])
+quote_store = QuoteStore(app.config['QUOTE_STORE_PATH']) if app.config['QUOTE_STORE_PATH'] else None
+
+
+def price(inputs, schedule=True):
+    """price_quote, or its fixed-point paise version when FIXED_POINT_ROUNDING is set"""
+    rounding = app.config['FIXED_POINT_ROUNDING']
+    if rounding is None:
+        return price_quote(inputs, schedule)
+    quote = price_quote_paise(inputs, rounding)
+    if not schedule:
+        quote['schedule'] = None
+    return quote
+
+
+def stored_quote(inputs, schedule=True, compute=price):
+    """Quote from the on-disk store, priced with `compute(inputs, schedule)` on a miss.
+
+    Full quotes are persisted; a schedule-less request reuses one if stored.
+    Fixed-point quotes are kept apart from float ones.
+    """
+    rounding = app.config['FIXED_POINT_ROUNDING']
+    kind = 'quote' if rounding is None else f'quote-{rounding}'
+    if schedule:
+        return quote_store.get_or_compute(kind, inputs, lambda: compute(inputs, True))
+    quote = quote_store.get(kind, inputs)
+    if quote is None:
+        return compute(inputs, False)
+    return dict(quote, schedule=None)
+
+
+def cached_quote(inputs, schedule=True):
+    """Quote through the LRU cache (and the on-disk store if configured); returns a fresh dict per call"""
+    key = cache_key(inputs, schedule)
+    if quote_store is None:
+        return dict(quote_cache.get_or_compute(key, lambda: price(inputs, schedule)))
+    return dict(quote_cache.get_or_compute(key, lambda: stored_quote(inputs, schedule)))
+
+
+def _cache_metrics():
+    quote = quote_cache.stats()
+    fragment = fragment_cache.stats()
+    discount = discount_cache_stats()
+    return [
+        ('quote_cache_hits_total', 'counter', 'Quote cache hits.', quote['hits']),
+        ('quote_cache_misses_total', 'counter', 'Quote cache misses.', quote['misses']),
+        ('quote_cache_evictions_total', 'counter', 'Quote cache evictions.', quote['evictions']),
+        ('quote_cache_entries', 'gauge', 'Quotes currently cached.', quote['size']),
+        ('quote_cache_coalesced_total', 'counter', 'Quote cache misses that waited on an identical in-flight quote.',
+         quote['coalesced']),
+        ('fragment_cache_hits_total', 'counter', 'Rendered schedule page cache hits.', fragment['hits']),
+        ('fragment_cache_misses_total', 'counter', 'Rendered schedule page cache misses.', fragment['misses']),
+        ('discount_cache_hits_total', 'counter', 'Discount-factor cache hits.', discount['hits']),
+        ('discount_cache_misses_total', 'counter', 'Discount-factor cache misses.', discount['misses']),
+        ('discount_cache_bytes', 'gauge', 'Memory held by cached discount factors.', discount['bytes'])
+    ] + _store_metrics()
+
+
+def _store_metrics():
+    if quote_store is None:
+        return []
+    return [
+        ('quote_store_hits_total', 'counter', 'Quote store hits.', quote_store.hits),
+        ('quote_store_misses_total', 'counter', 'Quote store misses.', quote_store.misses),
+        ('quote_store_coalesced_total', 'counter', 'Quote store misses that waited on an identical in-flight quote.',
+         quote_store.coalesced)
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+# === Rendering ===
+
+FORM_FIELDS = {
+    'amount': 'loan_amount',
+    'rate': 'interest_rate',
+    'tenure': 'loan_tenure',
+    'gst_rate': 'gst_rate',
+    'loan_or_lease': 'loan_or_lease',
+    'loan_type': 'loan_type',
+    'residual_value': 'residual_value',
+    'payment_frequency': 'payment_frequency'
+}
+
+
+def schedule_page(table, inputs, page=1, page_size=None):
+    """Pre-formatted HTML rows for one page of the schedule priced for `inputs`, and the index of its last row.
+
+    Pages are cached in fragment_cache, keyed on the inputs and row range.
+    """
+    page_size = page_size or app.config['SCHEDULE_PAGE_SIZE'] or len(table)
+    start = (max(page, 1) - 1) * page_size
+    stop = min(start + page_size, len(table))
+    rows = fragment_cache.get_or_compute(cache_key(inputs, 'rows', start, stop), lambda: table.html_rows(start, stop))
+    return Markup(rows), stop
+
+
+def render_index(result=None, inputs=None, irr=None, irr_annual=None, table=None):
+    """Render index.html, the amortization table from cached row markup"""
+    table_rows, shown = schedule_page(table, inputs) if table else ('', 0)
+    schedule_query = urlencode({FORM_FIELDS[k]: v for k, v in (inputs or {}).items() if k in FORM_FIELDS})
+    return render_template(
+        "index.html",
+        result=result,
+        inputs=inputs,
+        irr=irr,
+        irr_monthly=irr,
+        irr_annual=irr_annual,
+        table=table or [],
+        table_rows=table_rows,
+        table_shown=shown,
+        schedule_query=schedule_query
+    )
 
-def irr(cashflows):
-    try:
-        result = root_scalar(lambda r: npv(r, cashflows), bracket=[0.00001, 1], method='brentq')
-        return result.root if result.converged else None
-    except Exception as e:
-        logging.warning("IRR calculation failed: %s", e)
-        return None
 
 # === Routes ===
 
@@ -26,161 +166,367 @@ def irr(cashflows):
 def index():
     result = None
     irr_value = None
-    irr_monthly = None
     irr_annual = None
-    table = []
-
-    inputs = {
-        'amount': '',
-        'rate': '',
-        'tenure': '',
-        'gst_rate': '',
-        'loan_or_lease': 'loan',
-        'loan_type': 'standard',
-        'residual_value': '',
-        'payment_frequency': 'monthly'
-    }
+    table = None
+
+    inputs = dict(DEFAULT_INPUTS)
 
     if request.method == 'POST':
         try:
             # Parse and validate inputs
-            amount = float(request.form.get('loan_amount', 0) or 0)
-            rate = float(request.form.get('interest_rate', 0) or 0)
-            tenure = int(request.form.get('loan_tenure', 0) or 0)
-            gst_rate = float(request.form.get('gst_rate', 0) or 0)
-            residual_value = float(request.form.get('residual_value', 0) or 0)
-            payment_frequency = request.form.get('payment_frequency', 'monthly')
-
-            loan_or_lease = request.form.get('loan_or_lease', 'loan')
-            loan_type = request.form.get('loan_type', 'standard')
-
-            inputs.update({
-                'amount': amount,
-                'rate': rate,
-                'tenure': tenure,
-                'gst_rate': gst_rate,
-                'loan_or_lease': loan_or_lease,
-                'loan_type': loan_type,
-                'residual_value': residual_value,
-                'payment_frequency': payment_frequency
-            })
-
-            if amount <= 0 or rate < 0 or tenure <= 0:
-                raise ValueError("Loan amount, interest rate, and tenure must be positive numbers.")
-
-            financed_amount = amount * (1 + gst_rate / 100)
-            freq_factor = 1 if payment_frequency == 'monthly' else 3
-            rate_periodic = rate / (12 * 100 / freq_factor)
-            total_periods = tenure // freq_factor
-            principal_base = financed_amount
-            cashflows = [-principal_base]
-
-            # Lease type EMI
-            if loan_or_lease == 'lease':
-                emi = round((amount * rate_periodic) / (1 - (1 + rate_periodic) ** -total_periods), 2)
-                balance = amount
-                for month in range(1, total_periods + 1):
-                    interest = round(balance * rate_periodic, 2)
-                    principal = round(emi - interest, 2)
-                    balance = round(balance - principal, 2)
-                    table.append({
-                        'Month': month * freq_factor,
-                        'Payment': emi,
-                        'Principal': principal,
-                        'Interest': interest,
-                        'Balance': max(balance, 0)
-                    })
-                    cashflows.append(emi)
-                if residual_value:
-                    table[-1]['Payment'] += residual_value
-                    cashflows[-1] += residual_value
-                result = f"Lease EMI is ₹{emi}"
-
-            # Loan - Standard EMI
-            elif loan_type == 'standard':
-                emi = round((principal_base * rate_periodic) / (1 - (1 + rate_periodic) ** -total_periods), 2)
-                balance = principal_base
-                for month in range(1, total_periods + 1):
-                    interest = round(balance * rate_periodic, 2)
-                    principal = round(emi - interest, 2)
-                    balance = round(balance - principal, 2)
-                    payment = emi
-                    if month == total_periods and residual_value:
-                        payment += residual_value
-                        cashflows.append(payment)
-                    else:
-                        cashflows.append(payment)
-                    table.append({
-                        'Month': month * freq_factor,
-                        'Payment': payment,
-                        'Principal': principal,
-                        'Interest': interest,
-                        'Balance': max(balance, 0)
-                    })
-                result = f"Loan EMI is ₹{emi}"
-
-            # Bullet Payment
-            elif loan_type == 'bullet':
-                interest_payment = round(principal_base * rate_periodic, 2)
-                for month in range(1, total_periods + 1):
-                    if month < total_periods:
-                        payment = interest_payment
-                        principal = 0
-                    else:
-                        principal = principal_base
-                        payment = round(interest_payment + principal + residual_value, 2)
-                    balance = principal_base - principal
-                    table.append({
-                        'Month': month * freq_factor,
-                        'Payment': payment,
-                        'Principal': principal,
-                        'Interest': interest_payment,
-                        'Balance': max(balance, 0)
-                    })
-                    cashflows.append(payment)
-                result = f"Bullet Payment: ₹{interest_payment} interest per period, principal ₹{principal_base} at end"
-
-            # Equal Principal
-            elif loan_type == 'equal_principal':
-                principal_const = round(principal_base / total_periods, 2)
-                balance = principal_base
-                for month in range(1, total_periods + 1):
-                    interest = round(balance * rate_periodic, 2)
-                    payment = round(principal_const + interest, 2)
-                    if month == total_periods and residual_value:
-                        payment += residual_value
-                        cashflows.append(payment)
-                    else:
-                        cashflows.append(payment)
-                    balance = round(balance - principal_const, 2)
-                    table.append({
-                        'Month': month * freq_factor,
-                        'Payment': payment,
-                        'Principal': principal_const,
-                        'Interest': interest,
-                        'Balance': max(balance, 0)
-                    })
-                result = f"Equal Principal: first payment ₹{round(principal_const + principal_base * rate_periodic, 2)}"
-
-            # IRR
-            irr_monthly = irr(cashflows)
-            if irr_monthly:
-                irr_value = round(irr_monthly * 100, 2)
-                irr_annual = round(irr_monthly * (12 / freq_factor) * 100, 2)
+            with timed('parse'):
+                inputs.update(parse_inputs(request.form))
+            quote = cached_quote(inputs)
+
+            result = quote['result']
+            irr_value = quote['irr_monthly']
+            irr_annual = quote['irr_annual']
+            table = quote['schedule']
 
         except Exception as e:
+            QUOTE_ERRORS.inc(endpoint='index')
             logging.exception("Error processing form inputs")
             result = f"Error: {str(e)}"
 
-    return render_template(
-        "index.html",
-        result=result,
-        inputs=inputs,
-        irr=irr_value,
-        irr_monthly=irr_value,
-        irr_annual=irr_annual,
-        table=table
-    )
+    with timed('render'):
+        return render_index(result, inputs, irr_value, irr_annual, table)
+
+
+@app.route('/schedule/rows')
+def schedule_rows():
+    """One page of amortization table rows as an HTML fragment (for "Show more")"""
+    try:
+        inputs = parse_inputs(request.args)
+        table = cached_quote(inputs)['schedule']
+        page = int(request.args.get('page', 1))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    if not table:
+        return Response('', mimetype='text/html')
+    with timed('render'):
+        rows, shown = schedule_page(table, inputs, page)
+    return Response(rows, mimetype='text/html', headers={'X-Rows-Shown': str(shown), 'X-Rows-Total': str(len(table))})
+
+# === JSON API ===
+
+def _flag(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() not in ('0', 'false', 'no', 'off')
+
+
+def quote_request(payload, schedule=None):
+    """(inputs, schedule, priced) of an API quote payload.
+
+    `schedule` is whether the table is returned (the payload's "schedule",
+    else the query's); `priced` whether the quote is priced with it, which a
+    dated XIRR (start_date) needs either way.
+    """
+    with timed('parse'):
+        inputs = parse_inputs(payload)
+        if int(payload.get('moratorium', 0) or 0) < 0:
+            raise ValueError("Moratorium must not be negative")
+    schedule = _flag(payload.get('schedule'), _flag(schedule))
+    return inputs, schedule, schedule or bool(payload.get('start_date'))
+
+
+def quote_json(payload, inputs, quote, schedule):
+    """JSON body of a quote priced for quote_request(payload)"""
+    table = quote.pop('schedule')
+    quote['inputs'] = inputs
+
+    # Date-exact annual rate when the disbursement date is known
+    if payload.get('start_date') and table is not None:
+        quote['xirr'] = schedule_xirr(table, -contract_terms(inputs)['financed_amount'],
+                                      payload['start_date'], payload.get('day_count', 'ACT/365F'),
+                                      payload.get('first_payment_date'), int(payload.get('moratorium', 0) or 0))
+
+    if schedule and table is not None:
+        quote['schedule'] = list(table.records())
+    return quote
+
+
+def _quote_json(payload, schedule):
+    inputs, schedule, priced = quote_request(payload, schedule)
+    return quote_json(payload, inputs, cached_quote(inputs, schedule=priced), schedule)
+
+
+def _read_payloads():
+    """Payload objects of a JSON array body, or of an NDJSON body (one per line).
+
+    Read and checked before any response starts, so a malformed body is a
+    400 rather than a truncated 200 stream.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        payloads = [json.loads(line) for line in request.stream if line.strip()]
+    else:
+        payloads = request.get_json(force=True, silent=True)
+        if not isinstance(payloads, list):
+            raise ValueError("Request body must be a JSON array of objects")
+    if not all(isinstance(payload, dict) for payload in payloads):
+        raise ValueError("Each item of the request body must be a JSON object")
+    return payloads
+
+
+@app.route('/api/quote', methods=['POST'])
+def api_quote():
+    payload = request.get_json(force=True, silent=True) or request.form
+    try:
+        return jsonify(_quote_json(payload, request.args.get('schedule')))
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_quote')
+        logging.exception("Error pricing API quote")
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/quotes', methods=['POST'])
+def api_quotes():
+    schedule = request.args.get('schedule')
+    try:
+        payloads = _read_payloads()
+    except ValueError as e:
+        QUOTE_ERRORS.inc(endpoint='api_quotes')
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        for payload in payloads:
+            try:
+                quote = _quote_json(payload, schedule)
+            except Exception as e:
+                QUOTE_ERRORS.inc(endpoint='api_quotes')
+                logging.exception("Error pricing API quote")
+                quote = {'error': str(e)}
+            yield json.dumps(quote) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/whatif', methods=['POST'])
+def api_whatif():
+    """Apply prepayment / rate / tenure / EMI events to a cached base schedule"""
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        inputs = parse_inputs(payload)
+        schedule = quote_cache.get_or_compute(cache_key(inputs, 'whatif'), lambda: whatif_from_inputs(inputs))
+        for event in payload.get('events', []):
+            schedule = apply_event(schedule, event)
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_whatif')
+        logging.exception("Error applying what-if events")
+        return jsonify({'error': str(e)}), 400
+
+    quote = {
+        'inputs': inputs,
+        'emi': schedule.emi,
+        'periods': len(schedule),
+        'total_payment': float(schedule.schedule.payment.sum()),
+        'irr_periodic': schedule.irr_periodic
+    }
+    if _flag(payload.get('schedule', request.args.get('schedule'))):
+        quote['schedule'] = list(schedule.schedule.records())
+    return jsonify(quote)
+
+
+MAX_GOAL_SEEK_TARGETS = 1000000
+
+
+def _goal_seek_targets(value):
+    # A number or a non-empty list of numbers (numeric strings as in forms)
+    values = value if isinstance(value, list) else [value]
+    if not 0 < len(values) <= MAX_GOAL_SEEK_TARGETS:
+        raise ValueError(f"target_emi must be a number or a list of 1 to {MAX_GOAL_SEEK_TARGETS} numbers")
+    try:
+        if any(isinstance(v, bool) for v in values):
+            raise TypeError
+        targets = [float(v) for v in values]
+    except (TypeError, ValueError):
+        raise ValueError("target_emi must be a number or a list of numbers") from None
+    if not all(math.isfinite(t) for t in targets):
+        raise ValueError("target_emi must be finite")
+    return targets if isinstance(value, list) else targets[0]
+
+
+@app.route('/api/goalseek', methods=['POST'])
+def api_goalseek():
+    """Rate, tenure or amount giving a target EMI (a number or a list of targets)"""
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        inputs = parse_inputs(payload)
+        targets = _goal_seek_targets(payload.get('target_emi'))
+        solved = goal_seek(inputs, targets, payload.get('solve_for', 'rate'))
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_goalseek')
+        logging.exception("Error in goal seek")
+        return jsonify({'error': str(e)}), 400
+
+    def clean(values):
+        values = values.tolist()
+        if isinstance(values, list):
+            return [None if math.isnan(v) else v for v in values]
+        return None if math.isnan(values) else values
+
+    return jsonify({'inputs': inputs, 'target_emi': payload.get('target_emi'),
+                    **{name: clean(values) for name, values in solved.items()}})
+
+
+MAX_SIMULATION_PATHS = 1000000
+
+
+@app.route('/api/simulate', methods=['POST'])
+def api_simulate():
+    """Expected IRR / NPV under prepayment and default hazards (annual %, scalar or curve)"""
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        inputs = parse_inputs(payload)
+        paths = int(payload.get('paths', 10000))
+        if not 0 < paths <= MAX_SIMULATION_PATHS:
+            raise ValueError(f"paths must be between 1 and {MAX_SIMULATION_PATHS}")
+        discount_rate = payload.get('discount_rate')
+        with timed('simulation'):
+            result = simulate(inputs, payload.get('prepayment', 0), payload.get('default', 0), paths,
+                              payload.get('seed'), float(payload.get('recovery_rate', 0)),
+                              int(payload.get('recovery_lag', 0)),
+                              None if discount_rate is None else float(discount_rate))
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_simulate')
+        logging.exception("Error simulating contract")
+        return jsonify({'error': str(e)}), 400
+    return jsonify(dict(summarize(result), inputs=inputs))
+
+
+@app.route('/api/leases', methods=['POST'])
+def api_leases():
+    """Price a JSON array (or NDJSON) of lease parameter sets in one vectorized pass"""
+    try:
+        with timed('parse'):
+            params = [parse_lease_inputs(payload) for payload in _read_payloads()]
+        with timed('schedule'):
+            priced = price_lease_batch(params)
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_leases')
+        logging.exception("Error pricing lease batch")
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        for i in range(len(params)):
+            quote = {name: column[i] for name, column in priced.items()}
+            if quote['error'] is not None:
+                QUOTE_ERRORS.inc(endpoint='api_leases')
+                quote = {'error': quote['error']}
+            else:
+                del quote['error']
+                quote = {name: None if math.isnan(value) else float(value) for name, value in quote.items()}
+            yield json.dumps(quote) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+# === Schedule Export ===
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+@app.route('/export/schedule.<fmt>', methods=['GET', 'POST'])
+def export_schedule(fmt):
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': f"Unsupported export format: {fmt}"}), 404
+    try:
+        inputs = parse_inputs(request.values)
+        if app.config['FIXED_POINT_ROUNDING'] is None:
+            rows = iter_schedule_rows(inputs)
+        else:
+            rows = zip(*(column.tolist() for column in cached_quote(inputs)['schedule'].columns()))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    if fmt == 'csv':
+        body = _csv_lines(itertools.chain([COLUMNS], rows))
+        headers = {'Content-Disposition': 'attachment; filename=schedule.csv'}
+        return Response(body, mimetype='text/csv', headers=headers)
+
+    body = (json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in rows)
+    return Response(body, mimetype='application/x-ndjson')
+
+
+def _axis(payload, name):
+    # A JSON list, or comma-separated values in form/query fields
+    value = payload.get(name)
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return [float(v) for v in value]
+
+
+MAX_SENSITIVITY_POINTS = 1000000
+
+
+@app.route('/export/sensitivity.<fmt>', methods=['GET', 'POST'])
+def export_sensitivity(fmt):
+    """EMI / IRR over rate x tenure x residual axes ("rates", "tenures", "residuals", "rate_shocks")"""
+    if fmt not in ('csv', 'json'):
+        return jsonify({'error': f"Unsupported export format: {fmt}"}), 404
+    payload = request.get_json(force=True, silent=True) or request.values
+    try:
+        inputs = parse_inputs(payload)
+        rates = _axis(payload, 'rates')
+        shocks = _axis(payload, 'rate_shocks')
+        if rates is None and shocks is not None:
+            rates = [inputs['rate'] + shock for shock in shocks]
+        tenures = _axis(payload, 'tenures')
+        residuals = _axis(payload, 'residuals')
+        points = math.prod(len(axis) if axis is not None else 1 for axis in (rates, tenures, residuals))
+        if points > MAX_SENSITIVITY_POINTS:
+            raise ValueError(f"Grids are limited to {MAX_SENSITIVITY_POINTS} points (rates x tenures x residuals)")
+        with timed('sensitivity'):
+            grid = sensitivity_grid(inputs, rates, tenures, residuals)
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='export_sensitivity')
+        return jsonify({'error': str(e)}), 400
+
+    if fmt == 'csv':
+        body = _csv_lines(itertools.chain([GRID_FIELDS], iter_grid_rows(grid)))
+        headers = {'Content-Disposition': 'attachment; filename=sensitivity.csv'}
+        return Response(body, mimetype='text/csv', headers=headers)
+
+    return jsonify(grid_json(grid))
+
+# === Metrics ===
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# === Warm-up ===
+
+WARMUP_INPUTS = parse_inputs({'loan_amount': '1000000', 'interest_rate': '9.5', 'loan_tenure': '60'})
+
+
+def warm_up(preload_solvers=False):
+    """Price and render a canonical quote so the first real request runs warm.
+
+    Fills the discount-factor cache and compiles the template; with
+    preload_solvers the SciPy fallback is imported too. Nothing is cached
+    in the quote cache.
+    """
+    if preload_solvers:
+        engine.preload()
+    quote = price(WARMUP_INPUTS)
+    with app.test_request_context('/'):
+        render_index(quote['result'], WARMUP_INPUTS, quote['irr_monthly'], quote['irr_annual'], quote['schedule'])
+
+
+if app.config['QUOTE_WARMUP'] or app.config['PRELOAD_SOLVERS']:
+    warm_up(app.config['PRELOAD_SOLVERS'])
 
 if __name__ == '__main__':
     app.run(debug=True,port=8000)
\ No newline at end of file
@@ -0,0 +1,357 @@
+"""ASGI serving mode.
+
+    uvicorn asgi:application --workers 1
+
+Request parsing and template rendering run on the event loop; schedule and
+IRR computation is sent to a bounded process pool, so one long quote does
+not block other requests. When more than ASGI_MAX_PENDING quotes are in
+flight new ones get 503 (backpressure) and a quote taking longer than
+ASGI_TIMEOUT seconds gets 504. Routes without a native handler run
+through the Flask app in a thread, streamed back in bounded batches.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from app import app, price, quote_cache, quote_json, quote_request, quote_store, render_index, stored_quote
+from calculations.cache import cache_key
+from calculations.metrics import QUOTE_ERRORS, recording, replay, timed
+from calculations.quote import DEFAULT_INPUTS, parse_inputs
+
+ASGI_WORKERS = int(os.environ.get('ASGI_WORKERS', os.cpu_count() or 1))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 256))
+ASGI_TIMEOUT = float(os.environ.get('ASGI_TIMEOUT', 10))
+
+
+class Overloaded(Exception):
+    pass
+
+
+def _price_recorded(inputs, schedule):
+    # Runs in a pool worker; its stage timings and IRR solver statistics
+    # go back with the quote to be recorded in the serving process
+    with recording() as records:
+        quote = price(inputs, schedule)
+    return quote, records
+
+
+class PricingPool:
+    """Process pool with a cap on queued + running quotes.
+
+    Concurrent misses on the same quote await one shared future, and with
+    a quote store configured the leader goes through the store's
+    get_or_compute (on a thread, holding its cross-process lock while the
+    pool prices), as app.cached_quote does.
+    """
+
+    def __init__(self, workers=ASGI_WORKERS, max_pending=ASGI_MAX_PENDING, timeout=ASGI_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._executor = None
+        self._threads = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        if self._threads is None and quote_store is not None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_pending)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        if self._threads is not None:
+            self._threads.shutdown(cancel_futures=True)
+            self._threads = None
+
+    def _release(self, job):
+        # Runs in the executor's thread (or inline if the job was cancelled);
+        # metrics are replayed even if the caller has stopped waiting
+        with self._lock:
+            self.pending -= 1
+        if not job.cancelled() and job.exception() is None:
+            replay(job.result()[1])
+
+    def _submit(self, inputs, schedule):
+        # The slot is released when the job leaves the pool, not when the
+        # caller stops waiting: a timed-out quote keeps its worker busy
+        with self._lock:
+            self.pending += 1
+        job = self._executor.submit(_price_recorded, inputs, schedule)
+        job.add_done_callback(self._release)
+        return job
+
+    def _price_blocking(self, inputs, schedule=True):
+        return self._submit(inputs, schedule).result()[0]
+
+    async def _price(self, inputs, schedule):
+        if quote_store is None:
+            quote, _ = await asyncio.wrap_future(self._submit(inputs, schedule))
+            return quote
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._threads, stored_quote, inputs, schedule, self._price_blocking)
+
+    async def quote(self, inputs, schedule=True):
+        """Cached quote, priced in the pool on a miss"""
+        key = cache_key(inputs, schedule)
+        cached = quote_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return dict(await asyncio.shield(flight))
+
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+        self.start()
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        # Mark a failure as retrieved even when nobody else was waiting
+        flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            quote = await asyncio.wait_for(self._price(inputs, schedule), self.timeout)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(quote)
+        finally:
+            del self._flights[key]
+        quote_cache.put(key, quote)
+        return dict(quote)
+
+
+pool = PricingPool()
+
+
+# === Plumbing ===
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get('body', b''))
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _respond(send, status, body, content_type, headers=()):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode('latin-1')),
+                    (b'content-length', str(len(body)).encode('latin-1'))] + list(headers)
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _respond_json(send, status, payload, headers=()):
+    await _respond(send, status, json.dumps(payload), 'application/json', headers)
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+def _form(body):
+    return dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+
+
+def _payload(scope, body):
+    # A JSON object, else a url-encoded form, as app.api_quote reads them;
+    # None for bodies only Flask parses (multipart)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if payload:
+        return payload
+    if not body or _header(scope, b'content-type').startswith('application/x-www-form-urlencoded'):
+        return _form(body)
+    return None
+
+
+def _environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+        'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for key, value in scope.get('headers', ()):
+        name = key.decode('latin-1').upper().replace('-', '_')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value.decode('latin-1')
+        elif name != 'CONTENT_LENGTH':
+            environ['HTTP_' + name] = value.decode('latin-1')
+    return environ
+
+
+def _call_wsgi(environ):
+    # Starts the Flask response; the body is pulled later, a batch at a time
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    chunks = app.wsgi_app(environ, start_response)
+    return started['status'], started['headers'], chunks
+
+
+STREAM_BATCH = 64 * 1024
+
+
+def _next_batch(iterator):
+    # Join chunks up to STREAM_BATCH bytes, so streamed exports (one CSV or
+    # NDJSON line per chunk) cost one executor hop per batch, not per line
+    batch = bytearray()
+    for chunk in iterator:
+        batch.extend(chunk)
+        if len(batch) >= STREAM_BATCH:
+            return bytes(batch), True
+    return bytes(batch), False
+
+
+async def _stream_wsgi(scope, body, send):
+    """Run a route through the Flask app, streaming its body in bounded batches"""
+    loop = asyncio.get_running_loop()
+    status, headers, chunks = await loop.run_in_executor(None, _call_wsgi, _environ(scope, body))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        })
+        iterator = iter(chunks)
+        more = True
+        while more:
+            content, more = await loop.run_in_executor(None, _next_batch, iterator)
+            await send({'type': 'http.response.body', 'body': content, 'more_body': more})
+    finally:
+        if hasattr(chunks, 'close'):
+            await loop.run_in_executor(None, chunks.close)
+
+
+# === Routes ===
+
+async def _index(scope, body, send):
+    result = None
+    irr_monthly = None
+    irr_annual = None
+    table = None
+    inputs = dict(DEFAULT_INPUTS)
+
+    if scope['method'] == 'POST':
+        try:
+            with timed('parse'):
+                inputs.update(parse_inputs(_form(body)))
+            quote = await pool.quote(inputs)
+            result = quote['result']
+            irr_monthly = quote['irr_monthly']
+            irr_annual = quote['irr_annual']
+            table = quote['schedule']
+        except Overloaded:
+            await _respond(send, 503, "Server busy, please retry", 'text/plain', [(b'retry-after', b'1')])
+            return
+        except asyncio.TimeoutError:
+            QUOTE_ERRORS.inc(endpoint='index')
+            result = "Error: calculation timed out"
+        except Exception as e:
+            QUOTE_ERRORS.inc(endpoint='index')
+            logging.exception("Error processing form inputs")
+            result = f"Error: {str(e)}"
+
+    with timed('render'), app.test_request_context('/', base_url=f"{scope.get('scheme', 'http')}://{_header(scope, b'host') or 'localhost'}"):
+        html = render_index(result, inputs, irr_monthly, irr_annual, table)
+    await _respond(send, 200, html, 'text/html; charset=utf-8')
+
+
+async def _api_quote(scope, body, send):
+    """app.api_quote, priced in the pool"""
+    payload = _payload(scope, body)
+    if payload is None:
+        await _stream_wsgi(scope, body, send)
+        return
+    try:
+        query = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        inputs, schedule, priced = quote_request(payload, query.get('schedule'))
+        quote = quote_json(payload, inputs, await pool.quote(inputs, priced), schedule)
+    except Overloaded:
+        await _respond_json(send, 503, {'error': 'Server busy, please retry'}, [(b'retry-after', b'1')])
+        return
+    except asyncio.TimeoutError:
+        QUOTE_ERRORS.inc(endpoint='api_quote')
+        await _respond_json(send, 504, {'error': 'Calculation timed out'})
+        return
+    except Exception as e:
+        QUOTE_ERRORS.inc(endpoint='api_quote')
+        logging.exception("Error pricing API quote")
+        await _respond_json(send, 400, {'error': str(e)})
+        return
+    await _respond_json(send, 200, quote)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            pool.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            pool.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    body = await _read_body(receive)
+    path, method = scope['path'], scope['method']
+    if path == '/' and method in ('GET', 'POST'):
+        await _index(scope, body, send)
+    elif path == '/api/quote' and method == 'POST':
+        await _api_quote(scope, body, send)
+    else:
+        await _stream_wsgi(scope, body, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run('asgi:application', port=8000)
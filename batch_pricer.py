@@ -0,0 +1,101 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from contextlib import nullcontext
+
+from calculations.batch import map_chunks
+from calculations.lease import parse_lease_inputs, price_lease
+from calculations.portfolio import aggregate
+from calculations.quote import parse_inputs, price_quote
+
+# Rows with an asset_cost go through the lease model (test.py fields),
+# everything else through the app.py form fields.
+OUTPUT_FIELDS = ['emi', 'irr_monthly', 'irr_annual', 'total_payment', 'total_interest', 'error']
+
+
+def price_row(row):
+    """Price one CSV row; errors are reported in the row, not raised"""
+    try:
+        if row.get('asset_cost'):
+            quote = price_lease(parse_lease_inputs(row))
+            emi = quote['emi']
+            financed = -quote['cashflows'][0]
+        else:
+            inputs = parse_inputs(row)
+            quote = price_quote(inputs, schedule=False)
+            emi = quote['installment']
+            financed = inputs['amount'] * (1 + inputs['gst_rate'] / 100)
+        return {
+            'emi': emi,
+            'irr_monthly': quote['irr_monthly'],
+            'irr_annual': quote['irr_annual'],
+            'total_payment': round(quote['total_payment'], 2),
+            'total_interest': round(quote['total_payment'] - financed, 2),
+            'error': ''
+        }
+    except Exception as e:
+        return dict.fromkeys(OUTPUT_FIELDS[:-1], '') | {'error': str(e)}
+
+
+def price_chunk(rows):
+    return [row | price_row(row) for row in rows]
+
+
+def price_file(src, dst, workers=None, chunk_size=1000):
+    """Price every contract in the CSV `src` and write the results to `dst`.
+
+    Chunks are priced in a process pool (calculations.batch.map_chunks), so
+    memory stays flat however large the book is. Output keeps input order.
+    """
+    reader = csv.DictReader(src)
+    writer = csv.DictWriter(dst, fieldnames=list(reader.fieldnames or []) + OUTPUT_FIELDS,
+                            extrasaction='ignore')
+    writer.writeheader()
+
+    count = 0
+    for priced in map_chunks(price_chunk, reader, chunk_size, workers or os.cpu_count() or 1):
+        writer.writerows(priced)
+        count += len(priced)
+    return count
+
+
+def write_ladder(args):
+    """Aggregate the book and write month, disbursed, collected, net rows"""
+    with open(args.input, newline='') as src:
+        ladder = aggregate(csv.DictReader(src), args.chunk_size, args.workers)
+    with open(args.output, 'w', newline='') if args.output else nullcontext(sys.stdout) as dst:
+        writer = csv.writer(dst)
+        writer.writerow(['month', 'disbursed', 'collected', 'net'])
+        writer.writerows((month, round(d, 2), round(c, 2), round(n, 2)) for month, d, c, n in ladder.rows())
+    summary = ladder.summary(args.discount_rate)
+    summary['errors'] = ladder.errors
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price a CSV book of loan and lease contracts")
+    parser.add_argument('input', help="contracts CSV, columns named like the form fields")
+    parser.add_argument('-o', '--output', help="output CSV (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="rows per task")
+    parser.add_argument('--ladder', action='store_true',
+                        help="pool the book into a monthly cash-flow ladder (start_month column) "
+                             "and print its IRR / NPV / duration instead of pricing each row")
+    parser.add_argument('--discount-rate', type=float, help="annual %% for the ladder NPV (default: its IRR)")
+    args = parser.parse_args(argv)
+
+    if args.ladder:
+        return write_ladder(args)
+    with open(args.input, newline='') as src:
+        if args.output:
+            with open(args.output, 'w', newline='') as dst:
+                count = price_file(src, dst, args.workers, args.chunk_size)
+        else:
+            count = price_file(src, sys.stdout, args.workers, args.chunk_size)
+    print(f"Priced {count} contracts", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
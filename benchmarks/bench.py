@@ -0,0 +1,153 @@
+"""Latency benchmarks for the EMI, schedule and IRR hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.bench -o before.json
+    python -m benchmarks.bench -o after.json --compare before.json
+
+Each case is timed with timeit (best-of-N autoranged loops) and reported in
+microseconds per call, so result files can be diffed between commits.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+
+import numpy as np
+
+import app as app_module
+import newton_raphson
+from calculations.engine import npv
+from calculations.irr import calculate_irr
+from calculations.loan_methods import calculate_loan
+
+TENURES = (12, 60, 120, 240, 360, 480)
+LOAN_TYPES = (
+    ('loan', 'standard'),
+    ('loan', 'bullet'),
+    ('loan', 'equal_principal'),
+    ('lease', 'standard')
+)
+AMOUNT = 2500000
+RATE = 9.5
+
+
+def _emi_cashflows(tenure):
+    r = RATE / 1200
+    emi = AMOUNT * r / (1 - (1 + r) ** -tenure)
+    return [-AMOUNT] + [emi] * tenure, emi
+
+
+def _cases():
+    client = app_module.app.test_client()
+
+    for tenure in TENURES:
+        cashflows, emi = _emi_cashflows(tenure)
+        rate = RATE / 1200
+        # app.npv was the engine's npv; the case keeps its name so old result files compare
+        yield f'app.npv[{tenure}]', lambda cf=cashflows, r=rate: npv(r, cf)
+        yield f'app.irr[{tenure}]', lambda cf=cashflows: app_module.irr(cf)
+        yield (f'newton_raphson.calculate_irr_newton_raphson[{tenure}]',
+               lambda e=emi, t=tenure: newton_raphson.calculate_irr_newton_raphson(AMOUNT, e, t / 12))
+        yield f'calculations.irr.calculate_irr[{tenure}]', lambda cf=cashflows: calculate_irr(cf)
+        yield f'calculate_loan.EMI[{tenure}]', lambda t=tenure: calculate_loan(AMOUNT, RATE, t, 'EMI')
+        yield (f'calculate_loan.equal_principal[{tenure}]',
+               lambda t=tenure: calculate_loan(AMOUNT, RATE, t, 'Equal Principal'))
+
+        for loan_or_lease, loan_type in LOAN_TYPES:
+            form = {
+                'loan_amount': AMOUNT,
+                'interest_rate': RATE,
+                'loan_tenure': tenure,
+                'gst_rate': 18,
+                'residual_value': 10000,
+                'loan_or_lease': loan_or_lease,
+                'loan_type': loan_type,
+                'payment_frequency': 'monthly'
+            }
+            yield (f'POST /[{loan_or_lease}:{loan_type}:{tenure}]',
+                   lambda f=form: client.post('/', data=f))
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min_us': round(min(per_call), 3),
+        'median_us': round(statistics.median(per_call), 3),
+        'loops': number,
+        'repeat': repeat
+    }
+
+
+def run(pattern=None, repeat=5, min_time=0.2, use_cache=False):
+    if not use_cache:
+        # Measure the computation, not quote cache hits
+        app_module.quote_cache.maxsize = 0
+        app_module.quote_cache.clear()
+
+    results = {}
+    for name, fn in _cases():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(fn, repeat, min_time)
+        print(f"{name:60s} {results[name]['median_us']:12.1f} us", file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'quote_cache': use_cache
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print per-case ratios against a baseline; returns the regressed cases"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        ratio = result['median_us'] / before['median_us']
+        flag = ' REGRESSION' if ratio > threshold else ''
+        print(f"{name:60s} {before['median_us']:12.1f} -> {result['median_us']:12.1f} us  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the quote pipeline hot paths")
+    parser.add_argument('-o', '--output', help="write JSON results here (default: stdout)")
+    parser.add_argument('-k', '--filter', help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument('--cache', action='store_true', help="leave the quote cache enabled")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    current = run(args.filter, args.repeat, args.min_time, args.cache)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    else:
+        json.dump(current, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# === Chunked Batch Processing ===
+#
+# Large books are read as a stream of rows, cut into lists of `size` rows
+# and handed to a function one chunk at a time. With several workers the
+# chunks run in a process pool, at most two per worker in flight, so
+# memory stays flat however long the stream is; results come back in
+# input order either way.
+
+IN_FLIGHT_PER_WORKER = 2
+
+
+def iter_chunks(rows, size):
+    """Lists of up to `size` consecutive items of `rows`"""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(fn, rows, size, workers=None):
+    """Yield fn(chunk) for each chunk of `rows`, in order.
+
+    With workers > 1 the chunks run in a process pool (`fn` must be
+    picklable), a bounded number in flight; otherwise in this process.
+    """
+    chunks = iter_chunks(rows, size)
+    if not workers or workers <= 1:
+        yield from map(fn, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# === Discount Factor Cache ===
+#
+# Products use a small set of periodic rates, so the (1 + r) ** -t vectors
+# behind EMIs and NPVs are built once per rate and shared across requests.
+# Entries are filled with Python's float pow so a cached factor is
+# bit-for-bit the value `(1 + r) ** -t` would give inline.
+
+
+class DiscountFactorCache:
+    """LRU cache of power vectors keyed on periodic rate, capped in elements"""
+
+    def __init__(self, max_elements=1 << 20):
+        self.max_elements = max_elements
+        self.elements = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def factors(self, rate, horizon, sign=-1):
+        """(1 + rate) ** (sign * t) for t = 0..horizon, as a read-only array"""
+        key = (float(rate), sign)
+        with self._lock:
+            table = self._data.get(key)
+            if table is not None and len(table) > horizon:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return table[:horizon + 1]
+            self.misses += 1
+
+        base = 1 + rate
+        table = np.array([base ** (sign * t) for t in range(horizon + 1)])
+        table.setflags(write=False)
+        if len(table) > self.max_elements:
+            return table
+
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.elements -= len(previous)
+            self._data[key] = table
+            self.elements += len(table)
+            while self.elements > self.max_elements:
+                _, evicted = self._data.popitem(last=False)
+                self.elements -= len(evicted)
+                self.evictions += 1
+        return table
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.elements = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'elements': self.elements,
+                'bytes': self.elements * 8,
+                'max_elements': self.max_elements,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+discount_cache = DiscountFactorCache()
+
+
+def discount_factors(rate, horizon):
+    """(1 + rate) ** -t for t = 0..horizon"""
+    return discount_cache.factors(rate, horizon, -1)
+
+
+def growth_factors(rate, horizon):
+    """(1 + rate) ** t for t = 0..horizon"""
+    return discount_cache.factors(rate, horizon, 1)
+
+
+def cache_stats():
+    return discount_cache.stats()
+
+
+def discount_factor(rate, periods):
+    """(1 + rate) ** -periods as a float, served from the cache"""
+    if periods < 0:
+        return growth_factor(rate, -periods)
+    return float(discount_factors(rate, periods)[periods])
+
+
+def growth_factor(rate, periods):
+    """(1 + rate) ** periods as a float, served from the cache"""
+    if periods < 0:
+        return discount_factor(rate, -periods)
+    return float(growth_factors(rate, periods)[periods])
@@ -0,0 +1,262 @@
+import logging
+
+import numpy as np
+
+from calculations.discount import discount_factors
+from calculations.metrics import IRR_FAILURES, observe_irr
+
+# === NPV / IRR Engine ===
+#
+# NPV is a polynomial in the discount factor v = 1 / (1 + rate):
+#     NPV(rate) = sum(cf_t * v ** t)
+# so it is evaluated with Horner's rule (one multiply-add per period, no
+# pow calls) and its derivative falls out of the same pass.
+
+
+def prepare_cashflows(cashflows):
+    """Return the cash flows as a float array (no copy if already one)"""
+    return np.asarray(cashflows, dtype=float)
+
+
+def _coefficients(cashflows):
+    # Horner walks from the highest power down, plain floats are fastest
+    return prepare_cashflows(cashflows)[::-1].tolist()
+
+
+def _horner(coeffs, v):
+    p = 0.0
+    for c in coeffs:
+        p = p * v + c
+    return p
+
+
+def _horner_with_derivative(coeffs, v):
+    p = dp = 0.0
+    for c in coeffs:
+        dp = dp * v + p
+        p = p * v + c
+    return p, dp
+
+
+def npv(rate, cashflows, start=0):
+    """Net Present Value with the first cash flow discounted `start` periods"""
+    if rate <= -1:
+        v = 1 / (1 + rate)
+        return _horner(_coefficients(cashflows), v) * v ** start
+    # Fixed product rates reuse the shared discount-factor vectors
+    cashflows = prepare_cashflows(cashflows)
+    factors = discount_factors(rate, start + len(cashflows) - 1)
+    return float(np.dot(cashflows, factors[start:]))
+
+
+def npv_and_derivative(rate, cashflows, start=0):
+    """NPV and dNPV/drate evaluated in a single Horner pass"""
+    v = 1 / (1 + rate)
+    p, dp = _horner_with_derivative(_coefficients(cashflows), v)
+    scale = v ** start
+    value = p * scale
+    # d/dv [v**start * P(v)] * dv/drate, with dv/drate = -v**2
+    derivative = -(start * p * scale * v + dp * scale * v * v)
+    return value, derivative
+
+
+def expand_bracket(f, lo, hi, max_expansions=60):
+    """Widen [lo, hi] towards -100% and upwards until f changes sign.
+
+    Returns (lo, hi, evaluations), with lo and hi None if no sign change is found.
+    """
+    f_lo, f_hi = f(lo), f(hi)
+    evaluations = 2
+    for _ in range(max_expansions):
+        if f_lo * f_hi <= 0:
+            return lo, hi, evaluations
+        if abs(f_lo) < abs(f_hi):
+            lo = (lo - 1) / 2 if lo > -1 else lo
+            f_lo = f(lo)
+        else:
+            hi = hi * 2 if hi > 0 else 1.0
+            f_hi = f(hi)
+        evaluations += 1
+    return None, None, evaluations
+
+
+def brentq(f, lo, hi):
+    """Brent's method on a sign-changing bracket.
+
+    SciPy is imported on first use rather than at module import: it is only
+    needed when Newton fails and costs several hundred ms of startup.
+    """
+    from scipy.optimize import root_scalar
+
+    return root_scalar(f, bracket=[lo, hi], method='brentq')
+
+
+def preload():
+    """Import the fallback solver ahead of the first request that needs it"""
+    import scipy.optimize
+
+
+def solve_irr(cashflows, guess=None, bracket=(0.00001, 1), tolerance=1e-12, max_iterations=50):
+    """Solve the periodic IRR; returns (rate, info).
+
+    Newton's method on the fused NPV/derivative pass, started from `guess`
+    (e.g. the contract's own periodic rate). If Newton stalls or diverges,
+    the bracket is widened until NPV changes sign and Brent's method takes
+    over. `info` records the method used, iteration and NPV evaluation
+    counts; rate is None when no root is found.
+    """
+    coeffs = _coefficients(cashflows)
+    info = {'method': 'newton', 'iterations': 0, 'evaluations': 0, 'converged': False}
+
+    # A NumPy scalar guess would run the loop (and its overflow) in NumPy
+    x = (bracket[0] + bracket[1]) / 2 if guess is None else float(guess)
+    for _ in range(max_iterations):
+        if x <= -1:
+            break
+        v = 1 / (1 + x)
+        p, dp = _horner_with_derivative(coeffs, v)
+        info['iterations'] += 1
+        info['evaluations'] += 1
+        df = -v * v * dp
+        if df == 0 or not np.isfinite(p) or not np.isfinite(df):
+            break
+        step = p / df
+        x -= step
+        if abs(step) < tolerance * (1 + abs(x)):
+            if x > -1:
+                info['converged'] = True
+                return x, info
+            break
+
+    # Fallback: Brent's method on an auto-expanded bracket
+    info['method'] = 'brentq'
+
+    def f(r):
+        return _horner(coeffs, 1 / (1 + r))
+
+    lo, hi, evaluations = expand_bracket(f, *bracket)
+    info['evaluations'] += evaluations
+    if lo is None:
+        return None, info
+    result = brentq(f, lo, hi)
+    info['iterations'] += result.iterations
+    info['evaluations'] += result.function_calls
+    info['converged'] = result.converged
+    return (result.root if result.converged else None), info
+
+
+def irr(cashflows, guess=None, bracket=(0.00001, 1)):
+    """Periodic IRR of evenly spaced cash flows, None if it cannot be solved"""
+    try:
+        rate, info = solve_irr(cashflows, guess, bracket)
+    except Exception as e:
+        IRR_FAILURES.inc()
+        logging.warning("IRR calculation failed: %s", e)
+        return None
+    observe_irr(info)
+    if rate is None:
+        logging.warning("IRR calculation failed: no root found after %d NPV evaluations", info['evaluations'])
+    return rate
+
+
+def percent(rate):
+    """A rate as a percentage rounded to 2 decimals; roots a hair below zero show 0.0, not -0.0"""
+    return round(rate * 100, 2) + 0.0
+
+
+# === Batch IRR ===
+
+def pad_cashflows(rows):
+    """Stack ragged cash-flow rows into a zero-padded 2-D array.
+
+    Trailing zeros do not change NPV, so padding is exact. Masked entries
+    and NaNs are treated as padding too.
+    """
+    if isinstance(rows, np.ndarray) and rows.ndim == 2:
+        cf = np.ma.filled(rows.astype(float), 0.0)
+    else:
+        rows = [np.ma.filled(np.asarray(row, dtype=float), 0.0) for row in rows]
+        width = max((len(row) for row in rows), default=0)
+        cf = np.zeros((len(rows), width))
+        for i, row in enumerate(rows):
+            cf[i, :len(row)] = row
+    return np.nan_to_num(cf, nan=0.0)
+
+
+def solve_batch(evaluate, n_rows, bracket, tolerance=2e-12, max_iterations=100, guess=None):
+    """Vectorized safeguarded Newton/bisection root finder.
+
+    `evaluate(x, rows)` returns (f, df) at rates x for the row indices
+    `rows`. Iterations start from `guess` (per row, or one value) where it
+    lies inside the bracket, else from its midpoint. Returns (roots,
+    converged); rows whose f does not change sign over the bracket or fail
+    to converge get NaN and False.
+    """
+    all_rows = np.arange(n_rows)
+    lo = np.full(n_rows, float(bracket[0]))
+    hi = np.full(n_rows, float(bracket[1]))
+    f_lo = evaluate(lo, all_rows)[0]
+    f_hi = evaluate(hi, all_rows)[0]
+
+    rates = np.full(n_rows, np.nan)
+    converged = np.zeros(n_rows, dtype=bool)
+
+    # Exact roots on the bracket ends
+    at_lo = f_lo == 0
+    at_hi = ~at_lo & (f_hi == 0)
+    rates[at_lo], rates[at_hi] = lo[at_lo], hi[at_hi]
+    converged |= at_lo | at_hi
+
+    active = np.flatnonzero(~converged & (np.sign(f_lo) != np.sign(f_hi)))
+    x = (lo + hi) / 2
+    if guess is not None:
+        guess = np.broadcast_to(np.asarray(guess, dtype=float), x.shape)
+        inside = (guess > lo) & (guess < hi)
+        x[inside] = guess[inside]
+
+    for _ in range(max_iterations):
+        if not active.size:
+            break
+        xa, la, ha = x[active], lo[active], hi[active]
+        f, df = evaluate(xa, active)
+
+        # Shrink the bracket around the sign change
+        same_as_lo = np.sign(f) == np.sign(f_lo[active])
+        la = np.where(same_as_lo, xa, la)
+        ha = np.where(same_as_lo, ha, xa)
+        f_lo[active] = np.where(same_as_lo, f, f_lo[active])
+
+        # Newton step, falling back to bisection when it leaves the bracket
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = xa - f / df
+        bisect = ~np.isfinite(step) | (step <= la) | (step >= ha)
+        x_new = np.where(bisect, (la + ha) / 2, step)
+
+        done = (f == 0) | (np.abs(x_new - xa) < tolerance) | (ha - la < tolerance)
+        x[active], lo[active], hi[active] = x_new, la, ha
+
+        finished = active[done]
+        rates[finished] = np.where(f[done] == 0, xa[done], x_new[done])
+        converged[finished] = True
+        active = active[~done]
+
+    return rates, converged
+
+
+def irr_batch(cashflows, bracket=(0.00001, 1), tolerance=2e-12, max_iterations=100):
+    """Solve the IRR of every row of a (contracts x periods) cash-flow array.
+
+    Uses a safeguarded Newton/bisection hybrid vectorized across rows, on the
+    same bracket as `irr`. Returns (rates, converged); rows whose NPV does not
+    change sign over the bracket or fail to converge get NaN and False.
+    """
+    cf = pad_cashflows(cashflows)
+    # One row of coefficients per power of v, highest power first
+    coeffs = np.ascontiguousarray(cf[:, ::-1].T)
+
+    def evaluate(x, rows):
+        v = 1 / (1 + x)
+        p, dp = _horner_with_derivative(coeffs[:, rows], v)
+        return p, -v * v * dp
+
+    return solve_batch(evaluate, cf.shape[0], bracket, tolerance, max_iterations)
@@ -0,0 +1,207 @@
+from decimal import Decimal
+
+import numpy as np
+
+from calculations.engine import irr, percent
+from calculations.quote import contract_terms
+from calculations.schedule import Schedule
+
+# === Fixed-point (Paise) Schedules ===
+#
+# Amounts are whole paise and rates exact fractions, so every rounding is
+# an integer division rounded by an explicit rule ('half_up': halves away
+# from zero, 'half_even': banker's rounding) and nothing drifts: the last
+# payment settles the exact balance left, which ends at 0.
+#
+# The annual rate is taken to RATE_SCALE (1e-4 %) units, making the
+# periodic rate a / b with integers a = units * freq_factor and
+# b = 1200 * RATE_SCALE. The EMI is the exactly rounded value of
+# P a (a + b)**n / (b ((a + b)**n - b**n)), in Python integers. Bullet and
+# equal-principal schedules have closed-form balances and are computed as
+# int64 arrays; the EMI recurrence depends on each rounded balance, so it
+# runs period by period on Python ints. Schedules are returned as ordinary
+# Schedule objects in rupees (paise / 100, which round-trip exactly through
+# schedule_paise), so caching, storage, rendering and exports are shared
+# with the float path.
+
+ROUNDING = ('half_up', 'half_even')
+RATE_DECIMALS = 4
+RATE_SCALE = 10 ** RATE_DECIMALS
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def _check_rounding(rounding):
+    if rounding not in ROUNDING:
+        raise ValueError(f"rounding must be one of {', '.join(ROUNDING)}")
+
+
+def round_div(numerator, denominator, rounding='half_up'):
+    """numerator / denominator rounded to an integer; works on ints and integer arrays.
+
+    `denominator` must be positive.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if rounding == 'half_up':
+        half_up = numerator >= 0
+    else:
+        half_up = quotient % 2 == 1
+    return quotient + ((twice > denominator) | ((twice == denominator) & half_up))
+
+
+def to_paise(amount, rounding='half_up'):
+    """Rupee amounts (scalar or array) to int64 paise, halves rounded by `rounding`.
+
+    Amounts typed with more than two decimals land within float noise of
+    their decimal value, so a fraction within a few ulps of half a paisa is
+    treated as an exact half.
+    """
+    _check_rounding(rounding)
+    scaled = np.asarray(amount, dtype=float) * 100
+    floor = np.floor(scaled)
+    fraction = scaled - floor
+    half = np.abs(fraction - 0.5) <= np.maximum(1e-6, 8 * np.spacing(np.abs(scaled)))
+    if rounding == 'half_up':
+        half_up = scaled > 0
+    else:
+        half_up = floor % 2 == 1
+    paise = (floor + np.where(half, half_up, fraction > 0.5)).astype(np.int64)
+    return int(paise) if paise.ndim == 0 else paise
+
+
+def schedule_paise(schedule):
+    """Exact int64 paise columns (payment, principal, interest, balance) of a fixed-point Schedule"""
+    return tuple(np.rint(column * 100).astype(np.int64)
+                 for column in (schedule.payment, schedule.principal, schedule.interest, schedule.balance))
+
+
+def periodic_rate(annual_rate, freq_factor=1):
+    """Periodic rate of an annual % as an exact (numerator, denominator) pair"""
+    units = Decimal(repr(float(annual_rate))) * RATE_SCALE
+    if units != units.to_integral_value():
+        raise ValueError(f"Fixed-point rates are limited to {RATE_DECIMALS} decimal places")
+    return int(units) * freq_factor, 1200 * RATE_SCALE
+
+
+def level_payment_paise(principal, rate, periods, rounding='half_up'):
+    """EMI in paise amortizing `principal` paise at rate (a, b) over `periods`, exactly rounded"""
+    a, b = rate
+    if a == 0:
+        return round_div(principal, periods, rounding)
+    growth = (a + b) ** periods
+    return round_div(principal * a * growth, b * (growth - b ** periods), rounding)
+
+
+def _interest(balance, rate, rounding):
+    # int64 while balance * a cannot overflow, Python ints (object arrays) beyond
+    a, b = rate
+    balance = np.asarray(balance, dtype=np.int64)
+    if len(balance) and int(np.abs(balance).max()) * a > INT64_MAX:
+        balance = balance.astype(object)
+    return np.asarray(round_div(balance * a, b, rounding), dtype=np.int64)
+
+
+def _schedule(months, payment, principal, interest, balance, installment, initial):
+    return Schedule(months, np.asarray(payment) / 100, np.asarray(principal) / 100, np.asarray(interest) / 100,
+                    np.asarray(balance) / 100, installment=installment / 100, initial=initial / 100)
+
+
+def emi_schedule_paise(principal, rate, total_periods, freq_factor=1, residual=0, rounding='half_up'):
+    """Level EMI schedule in paise, the last payment settling the exact balance (plus the residual)"""
+    a, b = rate
+    emi = level_payment_paise(principal, rate, total_periods, rounding)
+    payment = np.empty(total_periods, dtype=np.int64)
+    principal_col = np.empty(total_periods, dtype=np.int64)
+    interest_col = np.empty(total_periods, dtype=np.int64)
+    balance_col = np.empty(total_periods, dtype=np.int64)
+    balance = principal
+    for k in range(total_periods):
+        interest = round_div(balance * a, b, rounding)
+        paid = emi - interest if k < total_periods - 1 else balance
+        balance -= paid
+        payment[k], principal_col[k], interest_col[k], balance_col[k] = paid + interest, paid, interest, balance
+    if total_periods:
+        payment[-1] += residual
+    months = np.arange(1, total_periods + 1) * freq_factor
+    return _schedule(months, payment, principal_col, interest_col, balance_col, emi, -principal)
+
+
+def bullet_schedule_paise(principal, rate, total_periods, freq_factor=1, residual=0, rounding='half_up'):
+    """Interest-only payments in paise, principal and residual repaid with the last one"""
+    interest = int(_interest([principal], rate, rounding)[0])
+    payment = np.full(total_periods, interest, dtype=np.int64)
+    principal_col = np.zeros(total_periods, dtype=np.int64)
+    if total_periods:
+        payment[-1] += principal + residual
+        principal_col[-1] = principal
+    balance = principal - principal_col
+    months = np.arange(1, total_periods + 1) * freq_factor
+    return _schedule(months, payment, principal_col, np.full(total_periods, interest, dtype=np.int64), balance,
+                     interest, -principal)
+
+
+def equal_principal_schedule_paise(principal, rate, total_periods, freq_factor=1, residual=0, rounding='half_up'):
+    """Constant principal installments in paise, the last one taking the rounding remainder"""
+    installment = round_div(principal, total_periods, rounding)
+    principal_col = np.full(total_periods, installment, dtype=np.int64)
+    if total_periods:
+        principal_col[-1] = principal - installment * (total_periods - 1)
+    balance = principal - np.cumsum(principal_col)
+    interest = _interest(balance + principal_col, rate, rounding)
+    payment = principal_col + interest
+    if total_periods:
+        payment[-1] += residual
+    months = np.arange(1, total_periods + 1) * freq_factor
+    return _schedule(months, payment, principal_col, interest, balance, installment, -principal)
+
+
+def price_quote_paise(inputs, rounding='half_up'):
+    """price_quote in fixed-point paise; same result keys, schedule amounts exact to the paisa"""
+    _check_rounding(rounding)
+    terms = contract_terms(inputs)
+    freq_factor = terms['freq_factor']
+    total_periods = terms['total_periods']
+    if total_periods <= 0:
+        raise ValueError("Tenure must cover at least one payment period.")
+    rate = periodic_rate(inputs['rate'], freq_factor)
+    financed = to_paise(terms['financed_amount'], rounding)
+    residual = to_paise(inputs['residual_value'], rounding)
+    args = (rate, total_periods, freq_factor, residual, rounding)
+
+    if inputs['loan_or_lease'] == 'lease':
+        table = emi_schedule_paise(to_paise(inputs['amount'], rounding), *args)
+        result = "Lease EMI is ₹{}"
+    elif inputs['loan_type'] == 'standard':
+        table = emi_schedule_paise(financed, *args)
+        result = "Loan EMI is ₹{}"
+    elif inputs['loan_type'] == 'bullet':
+        table = bullet_schedule_paise(financed, *args)
+        result = f"Bullet Payment: ₹{{}} interest per period, principal ₹{financed / 100} at end"
+    elif inputs['loan_type'] == 'equal_principal':
+        table = equal_principal_schedule_paise(financed, *args)
+        result = "Equal Principal: first payment ₹{}"
+    else:
+        raise ValueError(f"Unknown loan type: {inputs['loan_type']}")
+
+    payment, principal, interest, _ = schedule_paise(table)
+    installment = table.installment
+    if inputs['loan_type'] == 'equal_principal' and inputs['loan_or_lease'] != 'lease':
+        # First payment, before any residual
+        installment = int(principal[0] + interest[0]) / 100
+
+    cashflows = table.cashflows(-financed / 100)
+    quote = {
+        'result': result.format(installment),
+        'installment': installment,
+        'total_payment': int(payment.sum()) / 100,
+        'irr_periodic': None,
+        'irr_monthly': None,
+        'irr_annual': None,
+        'schedule': table
+    }
+    irr_periodic = irr(cashflows, guess=rate[0] / rate[1])
+    if irr_periodic:
+        quote['irr_periodic'] = irr_periodic
+        quote['irr_monthly'] = percent(irr_periodic)
+        quote['irr_annual'] = percent(irr_periodic * (12 / freq_factor))
+    return quote
@@ -0,0 +1,121 @@
+import numpy as np
+
+from calculations.engine import solve_batch
+
+# === Goal Seek ===
+#
+# Inverts the level-payment formula
+#
+#     EMI = r * (P - R * v**n) / (1 - v**n),   v = 1 / (1 + r)
+#
+# used by index() (R = 0, the residual is paid on top of the last EMI) and
+# by test.py's calc_emi (R = residual amount), for the principal, the
+# number of periods or the periodic rate. Every argument broadcasts, so one
+# call answers many targets. Principal and tenure have closed forms; the
+# rate is found with the vectorized Newton/bisection solver.
+
+RATE_BRACKET = (1e-9, 1.0)
+
+
+def _discount(rate, periods):
+    # v ** n and 1 - v ** n, accurate for small rates; the exponent is capped
+    # so deeply negative trial rates stay finite inside the solver
+    exponent = np.minimum(-periods * np.log1p(rate), 600)
+    return np.exp(exponent), -np.expm1(exponent)
+
+
+def level_payment(principal, rate, periods, residual=0.0):
+    """Periodic payment amortizing `principal` down to `residual` (unrounded)"""
+    principal, rate, periods, residual = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                               (principal, rate, periods, residual)))
+    vn, one_minus_vn = _discount(rate, periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate == 0, (principal - residual) / periods,
+                        rate * (principal - residual * vn) / one_minus_vn)
+
+
+def principal_for_payment(payment, rate, periods, residual=0.0):
+    """Principal a payment of `payment` per period amortizes"""
+    payment, rate, periods, residual = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                             (payment, rate, periods, residual)))
+    vn, one_minus_vn = _discount(rate, periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(rate == 0, periods, one_minus_vn / rate)
+    return payment * annuity + residual * vn
+
+
+def periods_for_payment(payment, principal, rate, residual=0.0):
+    """Number of periods (fractional) for `payment` to amortize `principal`.
+
+    NaN where the payment does not cover the interest on the balance.
+    """
+    payment, principal, rate, residual = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                               (payment, principal, rate, residual)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # v ** n = (EMI - r P) / (EMI - r R)
+        vn = (payment - rate * principal) / (payment - rate * residual)
+        periods = np.where(rate == 0, (principal - residual) / payment, -np.log(vn) / np.log1p(rate))
+    return np.where(np.isfinite(periods) & (periods > 0), periods, np.nan)
+
+
+def rate_for_payment(payment, principal, periods, residual=0.0, bracket=RATE_BRACKET, guess=None):
+    """Periodic rate at which `payment` amortizes `principal` over `periods`.
+
+    Solved as the IRR of (-P, EMI x n, +R) with the annuity in closed form,
+    so each Newton step costs O(1) per target. NaN where no rate in the
+    bracket gives the payment (e.g. below the zero-interest EMI). `guess`
+    (broadcast like the other arguments) speeds up wide brackets.
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                   (payment, principal, periods, residual, np.nan if guess is None else guess)))
+    shape = arrays[0].shape
+    payment, principal, periods, residual, start = (a.ravel() for a in arrays)
+
+    def evaluate(x, rows):
+        emi, p, n, r = payment[rows], principal[rows], periods[rows], residual[rows]
+        vn, one_minus_vn = _discount(x, n)
+        annuity = one_minus_vn / x
+        # d(v**n)/dx = -n v**(n + 1)
+        dvn = -n * vn / (1 + x)
+        dannuity = (-dvn * x - one_minus_vn) / (x * x)
+        return emi * annuity + r * vn - p, emi * dannuity + r * dvn
+
+    valid = np.isfinite(payment) & np.isfinite(principal) & np.isfinite(periods) & np.isfinite(residual)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        rates, _ = solve_batch(evaluate, payment.size, bracket, guess=None if guess is None else start)
+    rates[~valid] = np.nan
+    return rates.reshape(shape)
+
+
+# === Goal Seek on Quote Inputs ===
+
+SOLVE_FOR = ('rate', 'tenure', 'amount')
+
+
+def goal_seek(inputs, target_emi, solve_for):
+    """Rate (annual %), tenure (months) or loan amount giving `target_emi`.
+
+    `inputs` are normalized form inputs (parse_inputs); the field being
+    solved for is ignored and the others may be arrays. GST is financed on
+    loans and not on leases, as in price_quote. Tenures are rounded up to
+    whole payment periods, so their EMI does not exceed the target.
+    """
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"solve_for must be one of {', '.join(SOLVE_FOR)}")
+    if inputs['loan_or_lease'] != 'lease' and inputs['loan_type'] != 'standard':
+        raise ValueError("Goal seek applies to standard EMI loans and leases only")
+
+    freq_factor = 1 if inputs['payment_frequency'] == 'monthly' else 3
+    gst = 1 + inputs['gst_rate'] / 100 if inputs['loan_or_lease'] != 'lease' else 1.0
+    rate = np.asarray(inputs['rate'], dtype=float) / (12 * 100 / freq_factor)
+    periods = np.asarray(inputs['tenure']) // freq_factor
+    principal = np.asarray(inputs['amount'], dtype=float) * gst
+    target_emi = np.asarray(target_emi, dtype=float)
+
+    if solve_for == 'rate':
+        periodic = rate_for_payment(target_emi, principal, periods)
+        return {'rate': periodic * (12 / freq_factor) * 100, 'rate_periodic': periodic}
+    if solve_for == 'tenure':
+        exact = periods_for_payment(target_emi, principal, rate)
+        return {'tenure': np.ceil(exact - 1e-9) * freq_factor, 'periods': exact}
+    return {'amount': principal_for_payment(target_emi, rate, periods) / gst}
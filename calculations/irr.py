@@ -1,7 +1,6 @@
+from calculations.engine import solve_irr
+
+
 def calculate_irr(cash_flows, iterations=100):
-    rate = 0.1
-    for _ in range(iterations):
-        npv = sum(cf / ((1 + rate) ** i) for i, cf in enumerate(cash_flows))
-        d_npv = sum(-i * cf / ((1 + rate) ** (i + 1)) for i, cf in enumerate(cash_flows))
-        rate -= npv / d_npv
-    return round(rate * 100, 2)
\ No newline at end of file
+    rate, _ = solve_irr(cash_flows, guess=0.1, max_iterations=iterations)
+    return round(rate * 100, 2) if rate is not None else None
\ No newline at end of file
@@ -0,0 +1,331 @@
+from dataclasses import MISSING, asdict, dataclass, fields
+from math import pow
+
+import numpy as np
+
+from calculations.discount import discount_factor, growth_factor
+from calculations.engine import irr, irr_batch, percent
+from calculations.schedule import Schedule
+
+# === Lease Pricing ===
+#
+# The lease model from test.py: supplier discount, security deposit,
+# upfront fee, moratorium capitalization, advance rentals and residual %.
+
+DEFAULT_LEASE_INPUTS = {
+    'asset_cost': '',
+    'rate': '',
+    'tenure': '',
+    'moratorium': '',
+    'security_deposit_pct': '',
+    'residual_pct': '',
+    'advance_rentals': '',
+    'upfront_fee_pct': '',
+    'supplier_discount_pct': '',
+    'payment_frequency': 'monthly',
+    'loan_type': 'standard',
+    'loan_or_lease': 'lease'
+}
+
+
+def parse_lease_inputs(form):
+    """Normalize lease form fields (or any mapping using the same names)"""
+    return {
+        'asset_cost': float(form.get('asset_cost', 0) or 0),
+        'rate': float(form.get('interest_rate', 0) or 0),
+        'tenure_months': int(form.get('tenure_months', 0) or 0),
+        'moratorium': int(form.get('moratorium', 0) or 0),
+        'security_deposit_pct': float(form.get('security_deposit_pct', 0) or 0),
+        'residual_pct': float(form.get('residual_pct', 0) or 0),
+        'advance_rentals': int(form.get('advance_rentals', 0) or 0),
+        'upfront_fee_pct': float(form.get('upfront_fee_pct', 0) or 0),
+        'supplier_discount_pct': float(form.get('supplier_discount_pct', 0) or 0),
+        'payment_frequency': form.get('payment_frequency', 'monthly'),
+        'loan_type': form.get('loan_type', 'standard'),
+        'loan_or_lease': form.get('loan_or_lease', 'lease')
+    }
+
+
+@dataclass
+class LeaseRequest:
+    """Typed lease/loan pricing request; field names match price_lease params"""
+
+    asset_cost: float
+    rate: float
+    tenure_months: int
+    moratorium: int = 0
+    security_deposit_pct: float = 0.0
+    residual_pct: float = 0.0
+    advance_rentals: int = 0
+    upfront_fee_pct: float = 0.0
+    supplier_discount_pct: float = 0.0
+    payment_frequency: str = 'monthly'
+    loan_type: str = 'standard'
+    loan_or_lease: str = 'lease'
+
+    @classmethod
+    def from_form(cls, form):
+        return cls(**parse_lease_inputs(form))
+
+    def price(self):
+        return price_lease(asdict(self))
+
+
+def calc_emi(P, r, n, R=0):
+    """Level payment amortizing P down to a residual R over n periods"""
+    if r == 0:
+        return (P - R) / n
+    return (r * (P - R / growth_factor(r, n))) / (1 - discount_factor(r, n))
+
+
+def price_lease(params):
+    """Price parsed lease inputs; returns the result text, EMI, cash flows, table and IRRs"""
+    if isinstance(params, LeaseRequest):
+        params = asdict(params)
+    # === Validations ===
+    if params['asset_cost'] <= 0 or params['tenure_months'] <= 0:
+        raise ValueError("Asset cost and tenure must be positive")
+    if params['advance_rentals'] > params['tenure_months']:
+        raise ValueError("Advance rentals cannot exceed total tenure")
+    if params['moratorium'] > params['tenure_months']:
+        raise ValueError("Moratorium period cannot exceed total tenure")
+
+    # === Core Calculations ===
+    # 1. Net Cost Calculation
+    net_cost = params['asset_cost'] * (1 - params['supplier_discount_pct']/100)
+
+    # 2. Security Deposit & Upfront Fee
+    deposit_amt = net_cost * (params['security_deposit_pct']/100)
+    fee_amt = net_cost * (params['upfront_fee_pct']/100)
+
+    # 3. Residual Value
+    residual_amt = net_cost * (params['residual_pct']/100) if params['residual_pct'] > 0 else 0
+
+    # 4. Principal Calculation
+    principal = net_cost - deposit_amt + fee_amt
+
+    # 5. Payment Frequency Adjustment
+    freq_map = {'monthly': 1, 'quarterly': 3}
+    freq_factor = freq_map.get(params['payment_frequency'], 1)
+    total_periods = params['tenure_months'] // freq_factor
+    periodic_rate = (params['rate']/100) * (freq_factor/12)
+
+    # 6. Moratorium Handling (Interest Capitalization)
+    if params['moratorium'] > 0 and periodic_rate > 0:
+        principal *= growth_factor(periodic_rate, params['moratorium'])
+
+    # 7. Cashflow Construction
+    cashflows = [-principal]
+    table = []
+    emi = 0
+
+    if params['loan_or_lease'] == 'lease':
+        # Lease-specific calculations
+        remaining_periods = total_periods - params['advance_rentals']
+        if remaining_periods <= 0:
+            raise ValueError("Advance rentals exceed total payment periods")
+
+        emi = calc_emi(principal, periodic_rate, remaining_periods, residual_amt)
+        emi = round(emi, 2)
+
+        # Advance rentals as upfront payments, then regular payments with
+        # residual; the table's payment column is the tail of the cash flows
+        advance = params['advance_rentals']
+        cashflows = np.empty(advance + remaining_periods + 1)
+        cashflows[0] = -principal
+        cashflows[1:advance + 1] = emi
+        principal_col = []
+        interest_col = []
+        balance_col = []
+
+        bal = principal
+        for period in range(1, remaining_periods + 1):
+            interest = round(bal * periodic_rate, 2)
+            principal_pmt = round(emi - interest, 2)
+            bal -= principal_pmt
+
+            final_payment = emi
+            if period == remaining_periods and residual_amt > 0:
+                final_payment += residual_amt
+
+            cashflows[advance + period] = final_payment
+            principal_col.append(principal_pmt)
+            interest_col.append(interest)
+            balance_col.append(max(round(bal, 2), 0))
+        months = np.arange(1, remaining_periods + 1) * freq_factor
+        table = Schedule(months, None, principal_col, interest_col, balance_col, installment=emi,
+                         label='Period', flows=cashflows)
+        result = f"Lease EMI: ₹{emi:.2f}"
+    else:
+        # Loan-specific calculations
+        remaining_periods = total_periods - params['advance_rentals']
+        if params['loan_type'] == 'bullet':
+            emi = round(principal * periodic_rate, 2)
+            # Bullet payment at end
+            for _ in range(params['advance_rentals']):
+                cashflows.append(emi)
+            for period in range(1, remaining_periods):
+                cashflows.append(emi)
+            final_payment = emi + principal + (residual_amt if residual_amt else 0)
+            cashflows.append(final_payment)
+        else:
+            emi = calc_emi(principal, periodic_rate, remaining_periods, residual_amt)
+            emi = round(emi, 2)
+            for _ in range(params['advance_rentals']):
+                cashflows.append(emi)
+            for _ in range(remaining_periods):
+                cashflows.append(emi)
+            if residual_amt > 0:
+                cashflows[-1] += residual_amt
+
+        result = f"{params['loan_type'].title()} EMI: ₹{emi:.2f}"
+
+    quote = {
+        'result': result,
+        'emi': emi,
+        'total_payment': float(sum(cashflows[1:])),
+        'cashflows': cashflows,
+        'table': table,
+        'irr_periodic': None,
+        'irr_monthly': None,
+        'irr_annual': None
+    }
+
+    # 8. IRR Calculation with proper annualization
+    irr_periodic = irr(cashflows, guess=periodic_rate)
+    if irr_periodic:
+        quote['irr_periodic'] = irr_periodic
+        quote['irr_monthly'] = percent(irr_periodic)
+        if params['payment_frequency'] == 'monthly':
+            quote['irr_annual'] = percent(pow(1 + irr_periodic, 12) - 1)
+        else:  # quarterly
+            quote['irr_annual'] = percent(pow(1 + irr_periodic, 4) - 1)
+
+    return quote
+
+
+# === Batch Lease Pricing ===
+#
+# Prices many parameter sets at once: the terms, EMIs and cash flows are
+# built as arrays (one row per contract) and the IRRs solved together with
+# engine.irr_batch. Powers and cent rounding go through the same scalar
+# helpers as price_lease, so EMIs match it exactly; rows the batch solver
+# cannot bracket are re-solved with irr().
+
+LEASE_FIELDS = tuple(field.name for field in fields(LeaseRequest))
+
+
+def lease_columns(requests):
+    """Column arrays for LeaseRequests, parsed param dicts, or a mapping of columns.
+
+    Columns of a mapping broadcast against each other, so scalar terms can be
+    shared across an array of asset costs; missing fields take their defaults.
+    """
+    if isinstance(requests, dict):
+        columns = {field.name: requests[field.name] if field.default is MISSING else
+                   requests.get(field.name, field.default) for field in fields(LeaseRequest)}
+        columns = dict(zip(columns, np.broadcast_arrays(*(np.asarray(v) for v in columns.values()))))
+    else:
+        rows = [asdict(r) if isinstance(r, LeaseRequest) else r for r in requests]
+        columns = {name: np.array([row[name] for row in rows]) for name in LEASE_FIELDS}
+    for name in ('tenure_months', 'moratorium', 'advance_rentals'):
+        columns[name] = columns[name].astype(int)
+    for name in ('asset_cost', 'rate', 'security_deposit_pct', 'residual_pct', 'upfront_fee_pct',
+                 'supplier_discount_pct'):
+        columns[name] = columns[name].astype(float)
+    return columns
+
+
+def _batch_errors(c, remaining, lease, bullet):
+    errors = np.full(len(remaining), None, dtype=object)
+    checks = (
+        (lease & (remaining <= 0), "Advance rentals exceed total payment periods"),
+        (~lease & ~bullet & (remaining == 0), "No payment periods left after advance rentals"),
+        (c['moratorium'] > c['tenure_months'], "Moratorium period cannot exceed total tenure"),
+        (c['advance_rentals'] > c['tenure_months'], "Advance rentals cannot exceed total tenure"),
+        ((c['asset_cost'] <= 0) | (c['tenure_months'] <= 0), "Asset cost and tenure must be positive")
+    )
+    # Later checks win, matching the order price_lease validates in
+    for failed, message in checks:
+        errors[failed] = message
+    return errors
+
+
+def price_lease_batch(requests):
+    """Price many lease/loan parameter sets in one call.
+
+    Returns a dict of arrays (one entry per contract): emi, principal,
+    total_payment, irr_periodic, irr_monthly, irr_annual and error. Failed
+    rows carry their error message and NaN elsewhere.
+    """
+    c = lease_columns(requests)
+    net_cost = c['asset_cost'] * (1 - c['supplier_discount_pct']/100)
+    deposit_amt = net_cost * (c['security_deposit_pct']/100)
+    fee_amt = net_cost * (c['upfront_fee_pct']/100)
+    residual_amt = np.where(c['residual_pct'] > 0, net_cost * (c['residual_pct']/100), 0.0)
+    principal = net_cost - deposit_amt + fee_amt
+
+    freq_factor = np.where(c['payment_frequency'] == 'quarterly', 3, 1)
+    total_periods = c['tenure_months'] // freq_factor
+    periodic_rate = (c['rate']/100) * (freq_factor/12)
+    remaining = total_periods - c['advance_rentals']
+
+    lease = c['loan_or_lease'] == 'lease'
+    bullet = ~lease & (c['loan_type'] == 'bullet')
+    errors = _batch_errors(c, remaining, lease, bullet)
+    ok = np.equal(errors, None)
+
+    capitalize = ok & (c['moratorium'] > 0) & (periodic_rate > 0)
+    principal[capitalize] *= [growth_factor(r, m) for r, m in
+                              zip(periodic_rate[capitalize].tolist(), c['moratorium'][capitalize].tolist())]
+
+    emi = np.full(len(principal), np.nan)
+    for i in np.flatnonzero(ok).tolist():
+        if bullet[i]:
+            emi[i] = round(principal[i] * periodic_rate[i], 2)
+        else:
+            emi[i] = round(calc_emi(principal[i], periodic_rate[i], int(remaining[i]), residual_amt[i]), 2)
+
+    # Level payments for the advance rentals and the remaining periods, the
+    # last one carrying the residual, plus the principal for bullet loans
+    # (which always make the final payment)
+    payments = c['advance_rentals'] + np.maximum(remaining, np.where(bullet, 1, 0))
+    rows = np.flatnonzero(ok)
+    n = payments[rows]
+    width = int(n.max()) + 1 if rows.size else 1
+    cashflows = np.zeros((rows.size, width))
+    cashflows[:, 0] = -principal[rows]
+    paid = np.arange(1, width) <= n[:, None]
+    cashflows[:, 1:] = np.where(paid, emi[rows, None], 0.0)
+    last = emi[rows] + np.where(bullet[rows], principal[rows], 0.0) + residual_amt[rows]
+    cashflows[np.arange(rows.size), n] = last
+
+    total_payment = np.full(len(principal), np.nan)
+    total_payment[rows] = cashflows[:, 1:].sum(axis=1)
+
+    rates, converged = irr_batch(cashflows)
+    for j in np.flatnonzero(~converged).tolist():
+        rate = irr(cashflows[j, :n[j] + 1], guess=periodic_rate[rows[j]])
+        rates[j] = rate if rate is not None else np.nan
+    irr_periodic = np.full(len(principal), np.nan)
+    irr_periodic[rows] = rates
+    irr_periodic[irr_periodic == 0] = np.nan
+
+    # Percentages rounded as price_lease rounds them
+    irr_monthly = np.full(len(principal), np.nan)
+    irr_annual = np.full(len(principal), np.nan)
+    for i in np.flatnonzero(~np.isnan(irr_periodic)).tolist():
+        x = float(irr_periodic[i])
+        irr_monthly[i] = percent(x)
+        periods_per_year = 12 if c['payment_frequency'][i] == 'monthly' else 4
+        irr_annual[i] = percent(pow(1 + x, periods_per_year) - 1)
+
+    return {
+        'emi': emi,
+        'principal': np.where(ok, principal, np.nan),
+        'total_payment': total_payment,
+        'irr_periodic': irr_periodic,
+        'irr_monthly': irr_monthly,
+        'irr_annual': irr_annual,
+        'error': errors
+    }
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# === Metrics ===
+#
+# Minimal in-process counters and histograms rendered in the Prometheus
+# text format. Observations are a bisect plus an increment under a lock,
+# cheap enough to leave on the quote hot path.
+#
+# Work done in another process (ASGI pool workers) is measured there under
+# recording(), which also captures each observation; the list travels back
+# with the result and replay() applies it to this process's metrics.
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100)
+
+_registry = []
+_collectors = []
+_recording = threading.local()
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+def _record(metric, method, value, labels):
+    records = getattr(_recording, 'records', None)
+    if records is not None:
+        records.append((metric.name, method, value, labels))
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        _record(self, 'inc', amount, labels)
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        _record(self, 'observe', value, labels)
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    labels = _label_text(self.labelnames + ('le',), key + (bound,))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _label_text(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def register_collector(collect):
+    """Register a callable returning (name, type, help, value) tuples at scrape time"""
+    _collectors.append(collect)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, help, value in collect():
+            lines.extend([f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {value}'])
+    return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def recording():
+    """Capture the observations this thread makes in the block, as a picklable list for replay()"""
+    records = _recording.records = []
+    try:
+        yield records
+    finally:
+        _recording.records = None
+
+
+def replay(records):
+    """Apply observations captured by recording(), e.g. in a worker process"""
+    metrics = {metric.name: metric for metric in _registry}
+    for name, method, value, labels in records:
+        getattr(metrics[name], method)(value, **labels)
+
+
+# === Quote Pipeline Metrics ===
+
+STAGE_SECONDS = Histogram('quote_stage_seconds', 'Latency of each quote pipeline stage.',
+                          labelnames=('stage',))
+QUOTE_ERRORS = Counter('quote_errors_total', 'Quotes that failed with an error.', ('endpoint',))
+IRR_SOLVES = Counter('irr_solves_total', 'IRR solves by the method that finished them.', ('method',))
+IRR_FAILURES = Counter('irr_failures_total', 'IRR solves that found no root or raised.')
+IRR_ITERATIONS = Histogram('irr_iterations', 'Solver iterations per IRR solve.', COUNT_BUCKETS)
+IRR_EVALUATIONS = Histogram('irr_function_evaluations', 'NPV evaluations per IRR solve.', COUNT_BUCKETS)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the enclosed block under `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def observe_irr(info):
+    """Record the solver statistics returned by engine.solve_irr"""
+    IRR_ITERATIONS.observe(info['iterations'])
+    IRR_EVALUATIONS.observe(info['evaluations'])
+    if info['converged']:
+        IRR_SOLVES.inc(method=info['method'])
+    else:
+        IRR_FAILURES.inc()
@@ -0,0 +1,231 @@
+import numpy as np
+
+from calculations.batch import map_chunks
+from calculations.discount import discount_factors
+from calculations.engine import irr
+from calculations.quote import contract_terms, parse_inputs
+from calculations.schedule import calculate_emi, equal_principal_schedule
+
+# === Portfolio Cash-Flow Ladder ===
+#
+# A book of contracts is pooled into one vector of cash flows by calendar
+# month: month 0 is the book date, a contract starting in month s disburses
+# in month s and pays in months s + f, s + 2f, ... (f = 1 monthly, 3
+# quarterly). Contracts are streamed in chunks; each chunk's payments are
+# expanded into flat (month, amount) arrays and scatter-added into the
+# ladder with np.bincount, so memory is bounded by the chunk size and the
+# ladder length, not by the size of the book.
+#
+# Level payments (standard loans, leases) and bullet loans are expanded
+# without building their schedules: every period pays the same amount
+# except the last, which carries the residual / principal. Equal-principal
+# loans take the payment column of their schedule. Amounts are the same
+# cent-rounded values price_quote's schedules hold.
+
+CHUNK_SIZE = 10000
+
+
+def _contract_flows(inputs):
+    """(financed amount, freq factor, periods, level payment, last payment).
+
+    Equal-principal loans have no level payment; their `last` is the whole
+    payment column.
+    """
+    terms = contract_terms(inputs)
+    periods = terms['total_periods']
+    if periods <= 0:
+        raise ValueError("Tenure must cover at least one payment period.")
+    rate = terms['rate_periodic']
+    financed = terms['financed_amount']
+    freq_factor = terms['freq_factor']
+    residual = inputs['residual_value']
+
+    if inputs['loan_or_lease'] == 'lease' or inputs['loan_type'] == 'standard':
+        principal = inputs['amount'] if inputs['loan_or_lease'] == 'lease' else financed
+        emi = calculate_emi(principal, rate, periods)
+        return financed, freq_factor, periods, emi, emi + residual if residual else emi
+    if inputs['loan_type'] == 'bullet':
+        interest_payment = round(financed * rate, 2)
+        return financed, freq_factor, periods, interest_payment, round(interest_payment + financed + residual, 2)
+    if inputs['loan_type'] == 'equal_principal':
+        schedule = equal_principal_schedule(financed, rate, periods, freq_factor, residual)
+        return financed, freq_factor, periods, None, schedule.payment
+    raise ValueError(f"Unknown loan type: {inputs['loan_type']}")
+
+
+def _level_streams(starts, factors, counts, levels, lasts):
+    # Contract i pays levels[i] in months starts[i] + k * factors[i] for
+    # k = 1..counts[i], its last payment replaced by lasts[i]
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    k = np.arange(ends[-1]) - np.repeat(ends - counts, counts) + 1
+    months = np.repeat(np.asarray(starts, dtype=np.int64), counts) + \
+        np.repeat(np.asarray(factors, dtype=np.int64), counts) * k
+    amounts = np.repeat(np.asarray(levels, dtype=float), counts)
+    amounts[ends - 1] = lasts
+    return months, amounts
+
+
+class CashflowLadder:
+    """Pooled cash flows of a book of contracts, bucketed by calendar month"""
+
+    def __init__(self, horizon=0):
+        self.disbursed = np.zeros(horizon + 1)
+        self.collected = np.zeros(horizon + 1)
+        self.contracts = 0
+        self.skipped = 0
+        self.errors = {}
+        self._weighted_rate = 0.0
+        self._financed = 0.0
+
+    def __len__(self):
+        return len(self.collected)
+
+    @property
+    def cashflows(self):
+        """Net cash flow of the book by month (collections less disbursements)"""
+        return self.collected - self.disbursed
+
+    def _grow(self, size):
+        if size > len(self):
+            extra = np.zeros(size - len(self))
+            self.disbursed = np.concatenate((self.disbursed, extra))
+            self.collected = np.concatenate((self.collected, extra))
+
+    def _scatter(self, name, months, amounts):
+        self._grow(int(months.max()) + 1)
+        # bincount is a scatter-add: amounts falling in the same month are summed
+        column = getattr(self, name)
+        column += np.bincount(months, weights=amounts, minlength=len(column))
+
+    def add_contracts(self, contracts):
+        """Pool an iterable of (inputs, start_month) pairs.
+
+        Contracts that cannot be priced are skipped and counted by error
+        message rather than failing the whole book.
+        """
+        disbursed_months, disbursed = [], []
+        level = ([], [], [], [], [])
+        ragged_months, ragged_amounts = [], []
+        for inputs, start in contracts:
+            try:
+                if start < 0:
+                    raise ValueError("Start month must not be negative")
+                financed, freq_factor, periods, payment, last = _contract_flows(inputs)
+            except (ValueError, ZeroDivisionError) as e:
+                self.skipped += 1
+                self.errors[str(e)] = self.errors.get(str(e), 0) + 1
+                continue
+            disbursed_months.append(start)
+            disbursed.append(financed)
+            if payment is None:
+                ragged_months.append(start + np.arange(1, periods + 1) * freq_factor)
+                ragged_amounts.append(last)
+            else:
+                for column, value in zip(level, (start, freq_factor, periods, payment, last)):
+                    column.append(value)
+            self._weighted_rate += financed * inputs['rate']
+            self._financed += financed
+
+        if not disbursed:
+            return
+        self.contracts += len(disbursed)
+        self._scatter('disbursed', np.asarray(disbursed_months, dtype=np.int64), np.asarray(disbursed))
+        if level[0]:
+            self._scatter('collected', *_level_streams(*level))
+        if ragged_months:
+            self._scatter('collected', np.concatenate(ragged_months), np.concatenate(ragged_amounts))
+
+    def merge(self, other):
+        """Add another ladder (e.g. one chunk's) into this one"""
+        self._grow(len(other))
+        self.disbursed[:len(other)] += other.disbursed
+        self.collected[:len(other)] += other.collected
+        self.contracts += other.contracts
+        self.skipped += other.skipped
+        for message, count in other.errors.items():
+            self.errors[message] = self.errors.get(message, 0) + count
+        self._weighted_rate += other._weighted_rate
+        self._financed += other._financed
+        return self
+
+    def average_rate(self):
+        """Financed-amount weighted average annual rate (%) of the pooled contracts"""
+        return self._weighted_rate / self._financed if self._financed else None
+
+    def irr(self):
+        """Pooled monthly IRR of the book, None if it cannot be solved"""
+        guess = self.average_rate()
+        return irr(self.cashflows, guess=None if guess is None else guess / 1200)
+
+    def npv(self, annual_rate):
+        """Net present value at month 0 of the book's cash flows at `annual_rate` %"""
+        return float(self.cashflows @ discount_factors(annual_rate / 1200, len(self) - 1))
+
+    def duration(self, rate_monthly):
+        """Macaulay duration of the collections in months, discounted at `rate_monthly`"""
+        factors = discount_factors(rate_monthly, len(self) - 1)
+        present = self.collected * factors
+        total = present.sum()
+        return float(np.arange(len(self)) @ present / total) if total else None
+
+    def summary(self, discount_rate=None):
+        """Pooled IRR, NPV and duration; NPV and duration at `discount_rate` % (default: the IRR)"""
+        pooled = self.irr()
+        if discount_rate is None:
+            rate = pooled
+            discount_rate = None if pooled is None else pooled * 1200
+        else:
+            rate = discount_rate / 1200
+        duration = None if rate is None else self.duration(rate)
+        return {
+            'contracts': self.contracts,
+            'skipped': self.skipped,
+            'months': len(self),
+            'disbursed': float(self.disbursed.sum()),
+            'collected': float(self.collected.sum()),
+            'average_rate': self.average_rate(),
+            'irr_monthly': pooled,
+            'irr_annual': None if pooled is None else pooled * 12 * 100,
+            'discount_rate': discount_rate,
+            'npv': None if rate is None else self.npv(discount_rate),
+            'duration_years': None if duration is None else duration / 12,
+            'modified_duration_years': None if duration is None else duration / 12 / (1 + rate)
+        }
+
+    def rows(self):
+        """(month, disbursed, collected, net) per month of the ladder"""
+        return zip(range(len(self)), self.disbursed.tolist(), self.collected.tolist(),
+                   self.cashflows.tolist())
+
+
+def parse_contract(row):
+    """(inputs, start_month) from form fields plus an optional start_month"""
+    return parse_inputs(row), int(row.get('start_month', 0) or 0)
+
+
+def _chunk_ladder(rows):
+    ladder = CashflowLadder()
+    contracts = []
+    for row in rows:
+        try:
+            contracts.append(parse_contract(row))
+        except (ValueError, TypeError) as e:
+            ladder.skipped += 1
+            ladder.errors[str(e)] = ladder.errors.get(str(e), 0) + 1
+    ladder.add_contracts(contracts)
+    return ladder
+
+
+def aggregate(rows, chunk_size=CHUNK_SIZE, workers=None):
+    """Pool a stream of contract rows (form fields + start_month) into a ladder.
+
+    Rows are consumed `chunk_size` at a time, so a generator over a CSV of
+    a million contracts is aggregated in bounded memory. With workers > 1
+    chunks are priced in a process pool (calculations.batch.map_chunks)
+    and their ladders summed.
+    """
+    ladder = CashflowLadder()
+    for chunk_ladder in map_chunks(_chunk_ladder, rows, chunk_size, workers):
+        ladder.merge(chunk_ladder)
+    return ladder
@@ -0,0 +1,168 @@
+import numpy as np
+
+from calculations.engine import irr, percent
+from calculations.metrics import timed
+from calculations.schedule import (bullet_schedule, calculate_emi, emi_schedule,
+                                   equal_principal_schedule, iter_bullet_rows, iter_emi_rows,
+                                   iter_equal_principal_rows)
+
+# === Quote Pipeline ===
+#
+# Shared by the HTML form and the JSON API: parse the form fields into the
+# normalized `inputs` dict, then price it.
+
+DEFAULT_INPUTS = {
+    'amount': '',
+    'rate': '',
+    'tenure': '',
+    'gst_rate': '',
+    'loan_or_lease': 'loan',
+    'loan_type': 'standard',
+    'residual_value': '',
+    'payment_frequency': 'monthly'
+}
+
+
+def parse_inputs(form):
+    """Normalize form fields (or a JSON object using the same names)"""
+    return {
+        'amount': float(form.get('loan_amount', 0) or 0),
+        'rate': float(form.get('interest_rate', 0) or 0),
+        'tenure': int(form.get('loan_tenure', 0) or 0),
+        'gst_rate': float(form.get('gst_rate', 0) or 0),
+        'loan_or_lease': form.get('loan_or_lease', 'loan'),
+        'loan_type': form.get('loan_type', 'standard'),
+        'residual_value': float(form.get('residual_value', 0) or 0),
+        'payment_frequency': form.get('payment_frequency', 'monthly')
+    }
+
+
+def _emi_cashflows(principal, rate_periodic, total_periods, residual_value, initial):
+    # Level payments are all the IRR needs, skip the amortization recurrence
+    emi = calculate_emi(principal, rate_periodic, total_periods)
+    cashflows = np.full(total_periods + 1, emi)
+    cashflows[0] = initial
+    if residual_value and total_periods:
+        cashflows[-1] += residual_value
+    return emi, cashflows
+
+
+def contract_terms(inputs):
+    """Validate inputs and derive the periodic terms of the contract"""
+    amount = inputs['amount']
+    rate = inputs['rate']
+    tenure = inputs['tenure']
+
+    if amount <= 0 or rate < 0 or tenure <= 0:
+        raise ValueError("Loan amount, interest rate, and tenure must be positive numbers.")
+
+    freq_factor = 1 if inputs['payment_frequency'] == 'monthly' else 3
+    return {
+        'financed_amount': amount * (1 + inputs['gst_rate'] / 100),
+        'freq_factor': freq_factor,
+        'rate_periodic': rate / (12 * 100 / freq_factor),
+        'total_periods': tenure // freq_factor
+    }
+
+
+def iter_schedule_rows(inputs):
+    """Stream the schedule rows for `inputs` without building the table"""
+    terms = contract_terms(inputs)
+    rate_periodic = terms['rate_periodic']
+    total_periods = terms['total_periods']
+    if total_periods <= 0:
+        raise ValueError("Tenure must cover at least one payment period.")
+    args = (rate_periodic, total_periods, terms['freq_factor'], inputs['residual_value'])
+
+    # EMIs are computed up front so bad terms fail before streaming starts
+    if inputs['loan_or_lease'] == 'lease':
+        principal = inputs['amount']
+        return iter_emi_rows(principal, *args, calculate_emi(principal, rate_periodic, total_periods))
+    principal = terms['financed_amount']
+    if inputs['loan_type'] == 'standard':
+        return iter_emi_rows(principal, *args, calculate_emi(principal, rate_periodic, total_periods))
+    if inputs['loan_type'] == 'bullet':
+        return iter_bullet_rows(principal, *args)
+    if inputs['loan_type'] == 'equal_principal':
+        return iter_equal_principal_rows(principal, *args)
+    return iter(())
+
+
+def price_quote(inputs, schedule=True):
+    """Price normalized inputs; returns the result text, IRRs and schedule.
+
+    With schedule=False the amortization table is not built where the IRR
+    does not need it.
+    """
+    terms = contract_terms(inputs)
+    amount = inputs['amount']
+    residual_value = inputs['residual_value']
+    loan_or_lease = inputs['loan_or_lease']
+    loan_type = inputs['loan_type']
+
+    freq_factor = terms['freq_factor']
+    rate_periodic = terms['rate_periodic']
+    total_periods = terms['total_periods']
+    principal_base = terms['financed_amount']
+
+    result = None
+    table = None
+    cashflows = None
+    installment = None
+
+    with timed('schedule'):
+        # Lease type EMI
+        if loan_or_lease == 'lease':
+            if schedule:
+                table = emi_schedule(amount, rate_periodic, total_periods, freq_factor, residual_value)
+            else:
+                installment, cashflows = _emi_cashflows(amount, rate_periodic, total_periods,
+                                                        residual_value, -principal_base)
+            result = "Lease EMI is ₹{}"
+
+        # Loan - Standard EMI
+        elif loan_type == 'standard':
+            if schedule:
+                table = emi_schedule(principal_base, rate_periodic, total_periods, freq_factor, residual_value)
+            else:
+                installment, cashflows = _emi_cashflows(principal_base, rate_periodic, total_periods,
+                                                        residual_value, -principal_base)
+            result = "Loan EMI is ₹{}"
+
+        # Bullet Payment
+        elif loan_type == 'bullet':
+            table = bullet_schedule(principal_base, rate_periodic, total_periods, freq_factor, residual_value)
+            result = f"Bullet Payment: ₹{{}} interest per period, principal ₹{principal_base} at end"
+
+        # Equal Principal
+        elif loan_type == 'equal_principal':
+            table = equal_principal_schedule(principal_base, rate_periodic, total_periods, freq_factor, residual_value)
+            installment = round(table.installment + principal_base * rate_periodic, 2)
+            result = "Equal Principal: first payment ₹{}"
+
+    if table is not None:
+        cashflows = table.cashflows(-principal_base)
+        if installment is None:
+            installment = table.installment
+    elif cashflows is None:
+        cashflows = [-principal_base]
+
+    quote = {
+        'result': result.format(installment) if result else None,
+        'installment': installment,
+        'total_payment': float(np.sum(cashflows[1:])),
+        'irr_periodic': None,
+        'irr_monthly': None,
+        'irr_annual': None,
+        'schedule': table if schedule else None
+    }
+
+    # IRR
+    with timed('irr'):
+        irr_periodic = irr(cashflows, guess=rate_periodic)
+    if irr_periodic:
+        quote['irr_periodic'] = irr_periodic
+        quote['irr_monthly'] = percent(irr_periodic)
+        quote['irr_annual'] = percent(irr_periodic * (12 / freq_factor))
+
+    return quote
@@ -0,0 +1,188 @@
+import numpy as np
+
+from calculations.discount import discount_factor
+
+# === Amortization Schedules ===
+#
+# Schedules are stored column-wise as NumPy arrays. The recurrences keep
+# the calculator's cent rounding (round() on interest, principal and
+# balance every period) so the numbers match the row-by-row version
+# exactly. The payment column is the tail of the IRR cash flow buffer, so
+# cash flows are a view rather than a copy, and rows are only materialized
+# (as slotted row views) when the schedule is iterated.
+
+COLUMNS = ('Month', 'Payment', 'Principal', 'Interest', 'Balance')
+
+
+class ScheduleRow:
+    """One schedule row; attribute access for templates, Period aliases Month"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, month, payment, principal, interest, balance):
+        self.Month = month
+        self.Payment = payment
+        self.Principal = principal
+        self.Interest = interest
+        self.Balance = balance
+
+    @property
+    def Period(self):
+        return self.Month
+
+
+class Schedule:
+    """Column-oriented amortization schedule.
+
+    `flows` optionally supplies the cash flow buffer the payments are the
+    tail of (e.g. with advance rentals in front); otherwise one is built as
+    `initial` followed by the payments. Float64 columns are used as given
+    (so memory-mapped arrays stay zero-copy) and all columns are read-only.
+    """
+
+    def __init__(self, month, payment, principal, interest, balance, installment=None, label='Month',
+                 initial=0.0, flows=None):
+        n = len(month)
+        if flows is None:
+            flows = np.empty(n + 1)
+            flows[0] = initial
+            flows[1:] = payment
+        else:
+            flows = np.asarray(flows, dtype=float)
+        self._flows = flows
+        self.month = np.array(month, dtype=int)
+        self.payment = flows[len(flows) - n:]
+        self.principal = np.asarray(principal, dtype=float)
+        self.interest = np.asarray(interest, dtype=float)
+        self.balance = np.asarray(balance, dtype=float)
+        for column in (flows,) + self.columns():
+            column.setflags(write=False)
+        self.installment = installment
+        self.label = label
+
+    def __len__(self):
+        return len(self.month)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        for values in zip(*(column.tolist() for column in self.columns())):
+            yield ScheduleRow(*values)
+
+    def columns(self):
+        return self.month, self.payment, self.principal, self.interest, self.balance
+
+    def records(self):
+        """Rows as dicts keyed by the column names (`label` for the first), e.g. for JSON"""
+        keys = (self.label,) + COLUMNS[1:]
+        for values in zip(*(column.tolist() for column in self.columns())):
+            yield dict(zip(keys, values))
+
+    def html_rows(self, start=0, stop=None):
+        """`<tr>` markup of rows [start, stop), formatted straight from the columns"""
+        return ''.join(
+            f'<tr><td>{m}</td><td>{p}</td><td>{pr}</td><td>{i}</td><td>{b}</td></tr>'
+            for m, p, pr, i, b in zip(*(column[start:stop].tolist() for column in self.columns()))
+        )
+
+    def cashflows(self, initial=None):
+        """Cash flows for IRR: the initial outlay at t=0 followed by the payments.
+
+        Returns the shared read-only buffer; an `initial` other than the one
+        the schedule was built with gets a copy.
+        """
+        if initial is None or initial == self._flows[0]:
+            return self._flows
+        flows = self._flows.copy()
+        flows[0] = initial
+        return flows
+
+    def nbytes(self):
+        return sum(column.nbytes for column in (self._flows, self.month, self.principal, self.interest, self.balance))
+
+
+def _months(total_periods, freq_factor):
+    return np.arange(1, total_periods + 1) * freq_factor
+
+
+def calculate_emi(principal, rate_periodic, total_periods):
+    return round((principal * rate_periodic) / (1 - discount_factor(rate_periodic, total_periods)), 2)
+
+
+ROW_DTYPE = np.dtype([('month', int), ('payment', float), ('principal', float),
+                      ('interest', float), ('balance', float)])
+
+
+def _from_rows(rows, total_periods, installment, initial=0.0):
+    # Fields of the structured buffer are strided views that would keep all
+    # of it alive; the columns are copied out contiguously and it is dropped
+    data = np.fromiter(rows, dtype=ROW_DTYPE, count=total_periods)
+    principal, interest, balance = (np.ascontiguousarray(data[name]) for name in ('principal', 'interest', 'balance'))
+    return Schedule(data['month'], data['payment'], principal, interest, balance,
+                    installment=installment, initial=initial)
+
+
+# Row generators yield (month, payment, principal, interest, balance) one
+# period at a time, so exports can stream a schedule in constant memory.
+
+def iter_emi_rows(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0, emi=None):
+    if emi is None:
+        emi = calculate_emi(principal, rate_periodic, total_periods)
+    balance = principal
+    for month in range(1, total_periods + 1):
+        interest = round(balance * rate_periodic, 2)
+        principal_paid = round(emi - interest, 2)
+        balance = round(balance - principal_paid, 2)
+        payment = emi
+        if month == total_periods and residual_value:
+            payment += residual_value
+        yield month * freq_factor, payment, principal_paid, interest, max(balance, 0.0)
+
+
+def iter_bullet_rows(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0):
+    interest_payment = round(principal * rate_periodic, 2)
+    for month in range(1, total_periods):
+        yield month * freq_factor, interest_payment, 0.0, interest_payment, principal
+    if total_periods:
+        payment = round(interest_payment + principal + residual_value, 2)
+        yield total_periods * freq_factor, payment, principal, interest_payment, 0.0
+
+
+def iter_equal_principal_rows(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0):
+    principal_const = round(principal / total_periods, 2)
+    balance = principal
+    for month in range(1, total_periods + 1):
+        interest = round(balance * rate_periodic, 2)
+        payment = round(principal_const + interest, 2)
+        if month == total_periods and residual_value:
+            payment += residual_value
+        balance = round(balance - principal_const, 2)
+        yield month * freq_factor, payment, principal_const, interest, max(balance, 0.0)
+
+
+def emi_schedule(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0):
+    """Level EMI schedule (standard loans and leases), residual paid with the last EMI"""
+    emi = calculate_emi(principal, rate_periodic, total_periods)
+    rows = iter_emi_rows(principal, rate_periodic, total_periods, freq_factor, residual_value, emi)
+    return _from_rows(rows, total_periods, emi, -principal)
+
+
+def bullet_schedule(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0):
+    """Interest-only payments with the principal and residual repaid at the end"""
+    interest_payment = round(principal * rate_periodic, 2)
+    payment = np.full(total_periods, interest_payment)
+    principal_col = np.zeros(total_periods)
+    if total_periods:
+        payment[-1] = round(interest_payment + principal + residual_value, 2)
+        principal_col[-1] = principal
+    balance = np.maximum(principal - principal_col, 0)
+    return Schedule(_months(total_periods, freq_factor), payment, principal_col,
+                    np.full(total_periods, interest_payment), balance, installment=interest_payment,
+                    initial=-principal)
+
+
+def equal_principal_schedule(principal, rate_periodic, total_periods, freq_factor=1, residual_value=0):
+    """Constant principal installments with interest on the declining balance"""
+    rows = iter_equal_principal_rows(principal, rate_periodic, total_periods, freq_factor, residual_value)
+    return _from_rows(rows, total_periods, round(principal / total_periods, 2), -principal)
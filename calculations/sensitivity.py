@@ -0,0 +1,75 @@
+import numpy as np
+
+from calculations.discount import discount_factors
+from calculations.goalseek import rate_for_payment
+
+# === Sensitivity Grids ===
+#
+# EMI and IRR over rate x tenure x residual axes for one product (standard
+# EMI loans and leases, priced as in price_quote). The EMI only depends on
+# rate and tenure, so it is computed once on that plane, from one cached
+# discount-factor vector per rate, and broadcast along the residual axis.
+# The IRR of every grid point is then one vectorized solve, with the
+# annuity of the level payments in closed form.
+
+IRR_BRACKET = (-0.5, 1.0)
+GRID_FIELDS = ('rate', 'tenure', 'residual_value', 'emi', 'irr_periodic', 'irr_annual')
+
+
+def sensitivity_grid(inputs, rates=None, tenures=None, residuals=None):
+    """EMI / IRR surfaces of shape (len(rates), len(tenures), len(residuals)).
+
+    `inputs` are normalized form inputs (parse_inputs) supplying the amount,
+    GST, product and frequency; each axis defaults to the inputs' own value.
+    Rates are annual %, tenures in months and residuals in currency.
+    """
+    if inputs['loan_or_lease'] != 'lease' and inputs['loan_type'] != 'standard':
+        raise ValueError("Sensitivity grids apply to standard EMI loans and leases only")
+    rates = np.atleast_1d(np.asarray(inputs['rate'] if rates is None else rates, dtype=float))
+    tenures = np.atleast_1d(np.asarray(inputs['tenure'] if tenures is None else tenures, dtype=int))
+    residuals = np.atleast_1d(np.asarray(inputs['residual_value'] if residuals is None else residuals,
+                                         dtype=float))
+    if inputs['amount'] <= 0 or (rates < 0).any() or (tenures <= 0).any():
+        raise ValueError("Loan amount, interest rate, and tenure must be positive numbers.")
+
+    freq_factor = 1 if inputs['payment_frequency'] == 'monthly' else 3
+    periods = tenures // freq_factor
+    if (periods <= 0).any():
+        raise ValueError("Tenure must cover at least one payment period.")
+    financed = inputs['amount'] * (1 + inputs['gst_rate'] / 100)
+    principal = inputs['amount'] if inputs['loan_or_lease'] == 'lease' else financed
+    rates_periodic = rates / (12 * 100 / freq_factor)
+
+    # (1 + r) ** -n for every rate x tenure, one shared vector per rate
+    horizon = int(periods.max())
+    discount = np.array([discount_factors(r, horizon)[periods] for r in rates_periodic.tolist()])
+
+    # EMI on the rate x tenure plane, cent-rounded as calculate_emi does
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = (principal * rates_periodic[:, None]) / (1 - discount)
+    emi = np.array([round(x, 2) for x in emi.ravel().tolist()]).reshape(emi.shape)
+
+    # Started from each point's contract rate, which the IRR stays close to
+    irr_periodic = rate_for_payment(emi[:, :, None], financed, periods[None, :, None],
+                                    residuals[None, None, :], IRR_BRACKET, guess=rates_periodic[:, None, None])
+    return {
+        'rate': rates,
+        'tenure': tenures,
+        'residual_value': residuals,
+        'emi': np.broadcast_to(emi[:, :, None], irr_periodic.shape),
+        'irr_periodic': irr_periodic,
+        'irr_annual': irr_periodic * (12 / freq_factor) * 100
+    }
+
+
+def iter_grid_rows(grid):
+    """Flatten a grid into (rate, tenure, residual_value, emi, irr_periodic, irr_annual) rows"""
+    rate, tenure, residual = np.meshgrid(grid['rate'], grid['tenure'], grid['residual_value'], indexing='ij')
+    columns = (rate, tenure, residual, grid['emi'], grid['irr_periodic'], grid['irr_annual'])
+    for values in zip(*(np.ravel(column).tolist() for column in columns)):
+        yield tuple(None if isinstance(v, float) and v != v else v for v in values)
+
+
+def grid_json(grid):
+    """Axes and (rate x tenure x residual) nested lists, NaN as None"""
+    return {name: np.where(np.isnan(values), None, values).tolist() for name, values in grid.items()}
@@ -0,0 +1,173 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calculations.discount import discount_factors
+from calculations.engine import irr, irr_batch
+from calculations.quote import contract_terms, price_quote
+
+# === Prepayment / Default Simulation ===
+#
+# Each path draws the period of its first event (full prepayment or
+# default) from the survival curve of the hazard rates, one uniform per
+# path, and which of the two it is from their relative hazards. A path's
+# cash flows are the scheduled payments up to the event, then either the
+# outstanding balance (prepayment) or a recovery on it (default).
+#
+# A path is fully determined by (event period, event type), so there are
+# at most 2n + 1 distinct cash-flow rows however many paths are drawn: IRR
+# and NPV are solved once per distinct row, in batch, and mapped back.
+
+NO_EVENT, PREPAYMENT, DEFAULT = 0, 1, 2
+EVENT_NAMES = ('none', 'prepayment', 'default')
+IRR_BRACKET = (-0.5, 1.0)
+
+
+def hazard_curve(annual, total_periods, freq_factor=1):
+    """Per-period event probabilities from annual rates in % (CPR / CDR style).
+
+    `annual` is one rate or a curve by period; a short curve is extended
+    with its last value.
+    """
+    annual = np.atleast_1d(np.asarray(annual, dtype=float)) / 100
+    if not len(annual):
+        annual = np.zeros(1)
+    if (annual < 0).any() or (annual > 1).any():
+        raise ValueError("Hazard rates must be between 0 and 100%")
+    curve = np.concatenate((annual, np.repeat(annual[-1], max(total_periods - len(annual), 0))))
+    return 1 - (1 - curve[:total_periods]) ** (freq_factor / 12)
+
+
+def draw_events(rng, size, prepayment, default):
+    """(event period, event type) per path; period n + 1 means no event"""
+    survival = np.cumprod((1 - prepayment) * (1 - default))
+    cumulative = 1 - survival
+    period = np.searchsorted(cumulative, rng.random(size), side='right') + 1
+
+    kind = np.full(size, NO_EVENT)
+    happened = period <= len(prepayment)
+    p, d = prepayment[period[happened] - 1], default[period[happened] - 1]
+    kind[happened] = np.where(rng.random(happened.sum()) * (p + d) < d, DEFAULT, PREPAYMENT)
+    return period, kind
+
+
+def cashflow_paths(schedule, initial, period, kind, residual_value=0, recovery_rate=0.0, recovery_lag=0):
+    """2-D array of cash flows, one row per (event period, event type) path.
+
+    Prepayment settles the balance after that period's payment (plus any
+    residual not yet paid); default misses the payment and recovers
+    `recovery_rate` of the balance outstanding `recovery_lag` periods later.
+    """
+    period = np.asarray(period)
+    kind = np.asarray(kind)
+    n = len(schedule)
+    t = np.arange(1, n + 1)
+    balance_before = np.concatenate(([schedule.balance[0] + schedule.principal[0]], schedule.balance))
+    residual_due = np.where(period < n, residual_value, 0.0)
+
+    paid_through = np.where(kind == DEFAULT, period - 1, np.minimum(period, n))
+    flows = np.zeros((len(period), n + 1 + recovery_lag))
+    flows[:, 0] = initial
+    flows[:, 1:n + 1] = np.where(t <= paid_through[:, None], schedule.payment, 0.0)
+
+    rows = np.arange(len(period))
+    prepaid = kind == PREPAYMENT
+    flows[rows[prepaid], period[prepaid]] += schedule.balance[period[prepaid] - 1] + residual_due[prepaid]
+    defaulted = kind == DEFAULT
+    recovery = recovery_rate * (balance_before[period[defaulted] - 1] + residual_due[defaulted])
+    flows[rows[defaulted], period[defaulted] + recovery_lag] += recovery
+    return flows
+
+
+def _solve_outcomes(flows, guess):
+    rates, converged = irr_batch(flows, bracket=IRR_BRACKET)
+    for i in np.flatnonzero(~converged).tolist():
+        rate = irr(flows[i], guess=guess)
+        rates[i] = np.nan if rate is None else rate
+    return rates
+
+
+def _simulate_chunk(args):
+    schedule, initial, residual_value, prepayment, default, recovery_rate, recovery_lag, \
+        discount_rate, guess, seed, size = args
+    rng = np.random.default_rng(seed)
+    period, kind = draw_events(rng, size, prepayment, default)
+
+    # Solve each distinct outcome once
+    codes = period * 3 + kind
+    unique, inverse = np.unique(codes, return_inverse=True)
+    flows = cashflow_paths(schedule, initial, unique // 3, unique % 3, residual_value, recovery_rate, recovery_lag)
+    rates = _solve_outcomes(flows, guess)
+    npvs = flows @ discount_factors(discount_rate, flows.shape[1] - 1)
+    counts = np.bincount(inverse, minlength=len(unique))
+    return period, kind, rates[inverse], npvs[inverse], counts @ flows
+
+
+def simulate(inputs, prepayment=0.0, default=0.0, paths=10000, seed=None, recovery_rate=0.0,
+             recovery_lag=0, discount_rate=None, workers=None, chunk_size=100000):
+    """Simulate `paths` prepayment/default paths of a quote's contract.
+
+    `inputs` are normalized form inputs (any loan type or lease);
+    `prepayment` and `default` are annual hazard rates in % (or curves by
+    period), `discount_rate` an annual % for the NPVs (default: the contract
+    rate). Chunks of `chunk_size` paths get their own seeds spawned from
+    `seed`, so results do not depend on `workers`; with workers > 1 the
+    chunks run in a process pool.
+
+    Returns per-path arrays (event_period, event, irr_periodic, npv) and
+    the mean cash-flow vector (expected_cashflows).
+    """
+    if recovery_lag < 0:
+        raise ValueError("Recovery lag must not be negative")
+    if not 0 <= recovery_rate <= 1:
+        raise ValueError("Recovery rate must be between 0 and 1")
+    terms = contract_terms(inputs)
+    schedule = price_quote(inputs)['schedule']
+    if not schedule:
+        raise ValueError("Tenure must cover at least one payment period.")
+    n = len(schedule)
+    freq_factor = terms['freq_factor']
+    rate = terms['rate_periodic']
+    discount_rate = rate if discount_rate is None else discount_rate / (12 * 100 / freq_factor)
+
+    prepayment = hazard_curve(prepayment, n, freq_factor)
+    default = hazard_curve(default, n, freq_factor)
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(schedule, -terms['financed_amount'], inputs['residual_value'], prepayment, default,
+               recovery_rate, recovery_lag, discount_rate, rate, s, size) for s, size in zip(seeds, sizes)]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, chunks))
+    else:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+
+    period, kind, rates, npvs, totals = zip(*results)
+    return {
+        'event_period': np.concatenate(period),
+        'event': np.concatenate(kind),
+        'irr_periodic': np.concatenate(rates),
+        'npv': np.concatenate(npvs),
+        'expected_cashflows': sum(totals) / paths,
+        'freq_factor': freq_factor
+    }
+
+
+def summarize(result, percentiles=(5, 50, 95)):
+    """Expected IRR / NPV and event shares of a simulate() result"""
+    annualize = 12 / result['freq_factor'] * 100
+    rates = result['irr_periodic']
+    pooled = irr(result['expected_cashflows'], guess=float(np.nanmedian(rates)))
+    summary = {
+        'paths': len(rates),
+        'expected_irr_annual': float(np.nanmean(rates) * annualize),
+        'pooled_irr_annual': None if pooled is None else pooled * annualize,
+        'expected_npv': float(np.mean(result['npv'])),
+        'unsolved_paths': int(np.isnan(rates).sum())
+    }
+    for q, value in zip(percentiles, np.nanpercentile(rates, percentiles) * annualize):
+        summary[f'irr_annual_p{q}'] = float(value)
+    for code, name in enumerate(EVENT_NAMES):
+        summary[f'{name}_share'] = float(np.mean(result['event'] == code))
+    return summary
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from calculations.cache import SingleFlight
+from calculations.schedule import Schedule
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays within the process
+    fcntl = None
+
+# === Quote Store ===
+#
+# Priced quotes persisted across processes and restarts. Metadata (result
+# text, EMI, IRRs, ...) lives in SQLite, one row per key; the schedule is a
+# (5, n + 1) float64 .npy file per key (cash flows, then month, principal,
+# interest and balance offset by one), opened memory-mapped so readers share
+# the page cache instead of recomputing or copying it.
+#
+# Keys are a SHA-256 of the quote kind and the normalized inputs, which also
+# name the .npy file, so a lookup is one primary-key query plus one open.
+# The database runs in WAL mode (readers never block on the writer) and
+# .npy files are written to a temporary name and os.replace()d into place
+# before their metadata row is committed, so a reader never sees a partial
+# schedule.
+#
+# get_or_compute() coalesces concurrent misses on the same key: threads of
+# a process wait on one in-flight computation, and the leader takes an
+# exclusive byte-range lock on `quotes.lock` (one byte per key, at an
+# offset derived from it) before pricing, so other processes missing on
+# the same key block on the lock and then find the stored quote.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS quotes (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    label TEXT,
+    installment REAL,
+    created REAL NOT NULL
+)
+'''
+
+# Quote entries holding arrays, written to the .npy file instead of SQLite
+ARRAY_FIELDS = ('schedule', 'table', 'cashflows')
+
+# np.load parses .npy headers with ast.literal_eval, which CPython 3.11
+# does not make safe to call from concurrent threads (spurious SystemError)
+_NPY_LOAD_LOCK = threading.Lock()
+
+
+def store_key(kind, inputs):
+    """Hex digest identifying a quote kind ('quote', 'lease') and its normalized inputs"""
+    payload = json.dumps([kind, inputs], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class QuoteStore:
+    """SQLite + memory-mapped .npy store of priced quotes, safe across processes"""
+
+    def __init__(self, path, coalesce=True):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesce = coalesce
+        os.makedirs(os.path.join(path, 'schedules'), exist_ok=True)
+        self._local = threading.local()
+        self._flights = SingleFlight()
+        self._lock_file = None
+        self._lock_pid = None
+        self._lock_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread and process; SQLite connections must not
+        # cross threads or survive a fork
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(os.path.join(self.path, 'quotes.sqlite'), timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _array_path(self, key):
+        return os.path.join(self.path, 'schedules', key[:2], key + '.npy')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM quotes').fetchone()[0]
+
+    def get(self, kind, inputs, default=None):
+        """Stored quote for `inputs`, its schedule memory-mapped, or `default`"""
+        quote = self._load(kind, store_key(kind, inputs))
+        with self._stats_lock:
+            if quote is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if quote is None else quote
+
+    def _load(self, kind, key):
+        row = self._connect().execute('SELECT quote, rows, label, installment FROM quotes WHERE key = ?',
+                                      (key,)).fetchone()
+        if row is None:
+            return None
+        quote, rows, label, installment = row
+        quote = json.loads(quote)
+        with _NPY_LOAD_LOCK:
+            data = np.load(self._array_path(key), mmap_mode='r')
+        flows = data[0]
+        # A schedule (even an empty one) is stored as five rows, bare cash flows as one
+        if len(data) > 1:
+            n = len(flows) - rows
+            schedule = Schedule(data[1, n:], None, data[2, n:], data[3, n:], data[4, n:],
+                                installment=installment, label=label, flows=flows)
+        else:
+            schedule = None
+        if kind == 'lease':
+            quote.update(table=schedule if schedule is not None else [], cashflows=flows)
+        else:
+            quote['schedule'] = schedule
+        return quote
+
+    def put(self, kind, inputs, quote):
+        """Persist a priced quote (price_quote with its schedule, or price_lease)"""
+        key = store_key(kind, inputs)
+        schedule = quote.get('schedule') if kind != 'lease' else quote.get('table')
+        if isinstance(schedule, Schedule):
+            flows = schedule.cashflows()
+            rows = len(schedule)
+            data = np.full((5, len(flows)), np.nan)
+            data[0] = flows
+            for i, column in enumerate((schedule.month, schedule.principal, schedule.interest, schedule.balance)):
+                data[i + 1, len(flows) - rows:] = column
+            label, installment = schedule.label, schedule.installment
+        else:
+            if quote.get('cashflows') is None:
+                raise ValueError("Only quotes with a schedule or cash flows can be stored")
+            data = np.asarray(quote['cashflows'], dtype=float)[None, :]
+            rows, label, installment = 0, None, None
+
+        path = self._array_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp, path)
+
+        metadata = {k: v for k, v in quote.items() if k not in ARRAY_FIELDS}
+        db = self._connect()
+        with db:
+            db.execute('INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                       (key, kind, json.dumps(inputs, sort_keys=True), json.dumps(metadata), rows, label,
+                        installment, time.time()))
+
+    def _lock_fd(self):
+        # One descriptor per process, shared by its threads and never closed:
+        # closing any descriptor of the file drops every lock the process holds
+        with self._lock_guard:
+            if self._lock_file is None or self._lock_pid != os.getpid():
+                self._lock_file = open(os.path.join(self.path, 'quotes.lock'), 'a+b')
+                self._lock_pid = os.getpid()
+            return self._lock_file.fileno()
+
+    def _compute_locked(self, kind, inputs, key, compute):
+        if fcntl is None or not self.coalesce:
+            quote = compute()
+            self.put(kind, inputs, quote)
+            return quote
+        fd = self._lock_fd()
+        offset = int(key[:10], 16)
+        fcntl.lockf(fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            # Another process may have priced it while we waited for the lock
+            quote = self._load(kind, key)
+            if quote is None:
+                quote = compute()
+                self.put(kind, inputs, quote)
+            return quote
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+
+    def get_or_compute(self, kind, inputs, compute):
+        """Stored quote for `inputs`, pricing and storing it with `compute` on a miss.
+
+        Concurrent misses on the same inputs, in this process or (with
+        `coalesce`, on POSIX) in others sharing the store, price it once.
+        """
+        sentinel = object()
+        quote = self.get(kind, inputs, sentinel)
+        if quote is not sentinel:
+            return quote
+        key = store_key(kind, inputs)
+        if not self.coalesce:
+            return self._compute_locked(kind, inputs, key, compute)
+        return self._flights.do(key, lambda: self._compute_locked(kind, inputs, key, compute))
+
+    @property
+    def coalesced(self):
+        """Misses that waited on an identical in-flight computation in this process"""
+        return self._flights.coalesced
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {'size': len(self), 'hits': hits, 'misses': misses, 'coalesced': self.coalesced}
@@ -0,0 +1,174 @@
+import numpy as np
+
+from calculations.engine import irr
+from calculations.quote import contract_terms
+from calculations.schedule import Schedule, calculate_emi, emi_schedule
+
+# === What-if Schedules ===
+#
+# Events (prepayment, rate change, tenure change, EMI change) take effect
+# after a given period. Rows up to that period are reused as they are and
+# only the tail is re-amortized, from the balance already on record, with
+# the same cent rounding as the base schedule. The IRR is re-solved warm,
+# starting from the previous schedule's IRR.
+
+MAX_PERIODS = 1200
+
+
+def _amortize(balance, rate, emi, periods=None):
+    """Tail rows (payment, principal, interest, balance) from `balance`.
+
+    With `periods` the EMI is paid exactly that many times (same recurrence
+    as the base schedule); without, payments run until the balance is
+    cleared, the last one covering whatever is left.
+    """
+    rows = []
+    count = periods if periods is not None else MAX_PERIODS
+    for _ in range(count):
+        interest = round(balance * rate, 2)
+        if periods is None and balance + interest <= emi:
+            rows.append((round(balance + interest, 2), balance, interest, 0.0))
+            return rows
+        principal_paid = round(emi - interest, 2)
+        if periods is None and principal_paid <= 0:
+            raise ValueError("EMI does not cover the interest due")
+        balance = round(balance - principal_paid, 2)
+        rows.append((emi, principal_paid, interest, max(balance, 0)))
+    if periods is None and balance > 0:
+        raise ValueError(f"Loan is not repaid within {MAX_PERIODS} periods")
+    return rows
+
+
+class WhatIfSchedule:
+    """EMI schedule that re-quotes prepayments and resets from a period onward"""
+
+    def __init__(self, principal, schedule, rates, emi, freq_factor=1, residual_value=0, guess=None,
+                 financed=None):
+        self.principal = principal
+        # Amount disbursed at t=0 for the IRR (leases amortize the pre-GST amount)
+        self.financed = principal if financed is None else financed
+        self.schedule = schedule
+        self.rates = rates
+        self.emi = emi
+        self.freq_factor = freq_factor
+        self.residual_value = residual_value
+        self.irr_periodic = irr(self.cashflows(), guess=guess)
+
+    @classmethod
+    def build(cls, principal, annual_rate, total_periods, freq_factor=1, residual_value=0, financed=None):
+        """Base schedule, as emi_schedule would price it"""
+        rate_periodic = annual_rate / (12 * 100 / freq_factor)
+        schedule = emi_schedule(principal, rate_periodic, total_periods, freq_factor, residual_value)
+        return cls(principal, schedule, np.full(total_periods, rate_periodic), schedule.installment,
+                   freq_factor, residual_value, guess=rate_periodic, financed=financed)
+
+    def __len__(self):
+        return len(self.schedule)
+
+    def cashflows(self):
+        return self.schedule.cashflows(-self.financed)
+
+    def _balance_after(self, period):
+        if not 0 <= period < len(self):
+            raise ValueError(f"Event period must be between 0 and {len(self) - 1}")
+        return float(self.schedule.balance[period - 1]) if period else self.principal
+
+    def _with_tail(self, period, tail, rate, emi, prepayment=0):
+        # Prefix rows are reused; the final row of the old schedule (the only
+        # one carrying the residual) is never part of the prefix.
+        s = self.schedule
+        payment, principal, interest, balance = np.array(tail, dtype=float).T
+        payment = np.concatenate((s.payment[:period], payment))
+        principal = np.concatenate((s.principal[:period], principal))
+        interest = np.concatenate((s.interest[:period], interest))
+        balance = np.concatenate((s.balance[:period], balance))
+        if prepayment:
+            payment[period - 1] += prepayment
+            principal[period - 1] += prepayment
+            balance[period - 1] = round(balance[period - 1] - prepayment, 2)
+        if self.residual_value:
+            payment[-1] += self.residual_value
+
+        total = len(payment)
+        months = np.arange(1, total + 1) * self.freq_factor
+        rates = np.concatenate((self.rates[:period], np.full(total - period, rate)))
+        schedule = Schedule(months, payment, principal, interest, balance, installment=emi, initial=-self.financed)
+        return WhatIfSchedule(self.principal, schedule, rates, emi, self.freq_factor,
+                              self.residual_value, guess=self.irr_periodic, financed=self.financed)
+
+    def prepay(self, period, amount, keep='tenure'):
+        """Part-prepayment with the payment of `period`.
+
+        keep='tenure' lowers the EMI over the remaining periods, keep='emi'
+        keeps the EMI and shortens the loan.
+        """
+        if period < 1:
+            raise ValueError("Prepayments are made with a scheduled payment (period >= 1)")
+        balance = round(self._balance_after(period) - amount, 2)
+        if balance <= 0:
+            raise ValueError("Prepayment exceeds the outstanding balance")
+        rate = float(self.rates[period])
+        if keep == 'emi':
+            tail = _amortize(balance, rate, self.emi)
+            emi = self.emi
+        else:
+            remaining = len(self) - period
+            emi = calculate_emi(balance, rate, remaining)
+            tail = _amortize(balance, rate, emi, remaining)
+        return self._with_tail(period, tail, rate, emi, prepayment=amount)
+
+    def reset_rate(self, period, annual_rate, keep='tenure'):
+        """New annual rate from the period after `period`"""
+        balance = self._balance_after(period)
+        rate = annual_rate / (12 * 100 / self.freq_factor)
+        if keep == 'emi':
+            return self._with_tail(period, _amortize(balance, rate, self.emi), rate, self.emi)
+        remaining = len(self) - period
+        emi = calculate_emi(balance, rate, remaining)
+        return self._with_tail(period, _amortize(balance, rate, emi, remaining), rate, emi)
+
+    def change_tenure(self, period, total_periods):
+        """Re-amortize the balance after `period` to finish at `total_periods`"""
+        if total_periods <= period:
+            raise ValueError("New tenure must extend past the event period")
+        balance = self._balance_after(period)
+        rate = float(self.rates[period])
+        remaining = total_periods - period
+        emi = calculate_emi(balance, rate, remaining)
+        return self._with_tail(period, _amortize(balance, rate, emi, remaining), rate, emi)
+
+    def change_emi(self, period, emi):
+        """Pay `emi` from the period after `period` until the loan is repaid"""
+        balance = self._balance_after(period)
+        rate = float(self.rates[period])
+        return self._with_tail(period, _amortize(balance, rate, emi), rate, emi)
+
+
+def whatif_from_inputs(inputs):
+    """Base what-if schedule for normalized form inputs (standard loans and leases)"""
+    terms = contract_terms(inputs)
+    if inputs['loan_or_lease'] == 'lease':
+        principal = inputs['amount']
+    elif inputs['loan_type'] == 'standard':
+        principal = terms['financed_amount']
+    else:
+        raise ValueError("What-if events apply to standard EMI loans and leases only")
+    return WhatIfSchedule.build(principal, inputs['rate'], terms['total_periods'], terms['freq_factor'],
+                                inputs['residual_value'], financed=terms['financed_amount'])
+
+
+def apply_event(schedule, event):
+    """Apply one event dict: {'type': ..., 'period': ..., 'value': ..., 'keep': ...}"""
+    kind = event['type']
+    period = int(event['period'])
+    value = event['value']
+    keep = event.get('keep', 'tenure')
+    if kind == 'prepayment':
+        return schedule.prepay(period, float(value), keep)
+    if kind == 'rate_change':
+        return schedule.reset_rate(period, float(value), keep)
+    if kind == 'tenure_change':
+        return schedule.change_tenure(period, int(value))
+    if kind == 'emi_change':
+        return schedule.change_emi(period, float(value))
+    raise ValueError(f"Unknown what-if event: {kind}")
@@ -0,0 +1,145 @@
+import numpy as np
+
+from calculations.engine import brentq, expand_bracket, solve_batch
+
+# === XIRR ===
+#
+# Dated cash flows are turned into year fractions from the first date once,
+# as a NumPy array, under the chosen day-count convention. The rate then
+# solves sum(cf * (1 + rate) ** -t) = 0 on those fractions.
+
+DAY_COUNTS = ('ACT/365F', 'ACT/360', 'ACT/ACT', '30/360')
+
+
+def _as_dates(dates):
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def _split(dates):
+    # Calendar year, month (1-12) and day (1-31) of datetime64[D] values
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    year = years.astype(int) + 1970
+    month = (months - years).astype(int) + 1
+    day = (dates - months).astype(int) + 1
+    return year, month, day
+
+
+def _year_length(year):
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return np.where(leap, 366, 365)
+
+
+def year_fractions(dates, start=None, day_count='ACT/365F'):
+    """Year fractions from `start` (default: the first date) to each date"""
+    dates = _as_dates(dates)
+    start = dates[0] if start is None else np.datetime64(start, 'D')
+    if day_count == 'ACT/365F':
+        return (dates - start).astype(int) / 365
+    if day_count == 'ACT/360':
+        return (dates - start).astype(int) / 360
+    if day_count == 'ACT/ACT':
+        # ISDA: days falling in leap years count 1/366, others 1/365
+        y1, _, _ = _split(np.atleast_1d(start))
+        y2, _, _ = _split(dates)
+        doy1 = (start - start.astype('datetime64[Y]')).astype(int)
+        doy2 = (dates - dates.astype('datetime64[Y]')).astype(int)
+        return (y2 - y1) + doy2 / _year_length(y2) - doy1 / _year_length(y1)
+    if day_count == '30/360':
+        # 30E/360: day 31 is treated as day 30
+        y1, m1, d1 = _split(np.atleast_1d(start))
+        y2, m2, d2 = _split(dates)
+        d1, d2 = np.minimum(d1, 30), np.minimum(d2, 30)
+        return (360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)) / 360
+    raise ValueError(f"Unknown day count convention: {day_count}")
+
+
+def add_months(start, months):
+    """`start` shifted by each month offset, clamping to the end of month"""
+    start = np.datetime64(start, 'D')
+    _, _, day = _split(np.atleast_1d(start))
+    target = start.astype('datetime64[M]') + np.asarray(months, dtype=int)
+    first = target.astype('datetime64[D]')
+    days_in_month = ((target + 1).astype('datetime64[D]') - first).astype(int)
+    return first + np.minimum(day - 1, days_in_month - 1)
+
+
+def schedule_dates(schedule, start_date, first_payment_date=None, moratorium=0):
+    """Payment dates for a schedule's Month column.
+
+    Payments fall `Month` months after `start_date`, pushed back by a
+    moratorium (in months). A `first_payment_date` anchors an irregular
+    first period, later payments keep their spacing from it.
+    """
+    months = np.asarray(schedule.month, dtype=int) + moratorium
+    if first_payment_date is None or not len(months):
+        return add_months(start_date, months)
+    return add_months(first_payment_date, months - months[0])
+
+
+def _npv_and_derivative(rate, cashflows, fractions):
+    discount = (1 + rate) ** -fractions
+    value = cashflows @ discount
+    derivative = -(fractions * cashflows) @ discount / (1 + rate)
+    return value, derivative
+
+
+def xirr(cashflows, dates=None, day_count='ACT/365F', fractions=None, guess=0.1,
+         tolerance=1e-12, max_iterations=50):
+    """Annual effective rate of dated cash flows, None if it cannot be solved.
+
+    Pass either `dates` (the first one is t=0) or precomputed `fractions`.
+    Newton from `guess`, with a Brent fallback on an expanded bracket.
+    """
+    cashflows = np.asarray(cashflows, dtype=float)
+    if fractions is None:
+        fractions = year_fractions(dates, day_count=day_count)
+    fractions = np.asarray(fractions, dtype=float)
+
+    rate = guess
+    for _ in range(max_iterations):
+        if rate <= -1:
+            break
+        value, derivative = _npv_and_derivative(rate, cashflows, fractions)
+        if derivative == 0 or not np.isfinite(value) or not np.isfinite(derivative):
+            break
+        step = value / derivative
+        rate -= step
+        if abs(step) < tolerance * (1 + abs(rate)):
+            return float(rate) if rate > -1 else None
+
+    def f(r):
+        return cashflows @ (1 + r) ** -fractions
+
+    lo, hi, _ = expand_bracket(f, -0.5, 1)
+    if lo is None:
+        return None
+    result = brentq(f, lo, hi)
+    return result.root if result.converged else None
+
+
+def xirr_batch(cashflows, fractions, bracket=(-0.99, 10), tolerance=2e-12, max_iterations=100):
+    """XIRR of every row of (contracts x flows) arrays of cash flows and year fractions.
+
+    `fractions` may be one row shared by all contracts. Pad ragged rows with
+    zero cash flows. Returns (rates, converged) like engine.irr_batch.
+    """
+    cf = np.nan_to_num(np.asarray(cashflows, dtype=float))
+    t = np.broadcast_to(np.asarray(fractions, dtype=float), cf.shape)
+
+    def evaluate(x, rows):
+        tr, cr = t[rows], cf[rows]
+        discount = (1 + x[:, None]) ** -tr
+        value = np.einsum('ij,ij->i', cr, discount)
+        derivative = -np.einsum('ij,ij->i', tr * cr, discount) / (1 + x)
+        return value, derivative
+
+    return solve_batch(evaluate, cf.shape[0], bracket, tolerance, max_iterations)
+
+
+def schedule_xirr(schedule, initial, start_date, day_count='ACT/365F', first_payment_date=None, moratorium=0):
+    """XIRR of a schedule disbursed (`initial`, negative) on `start_date`"""
+    dates = np.concatenate(([np.datetime64(start_date, 'D')],
+                            schedule_dates(schedule, start_date, first_payment_date, moratorium)))
+    return xirr(schedule.cashflows(initial), dates, day_count)
+
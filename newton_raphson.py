@@ -1,3 +1,7 @@
+from calculations import engine
+from calculations.discount import growth_factor
+
+
 def calculate_emi(principal, annual_rate, years):
     r = annual_rate / 100 / 12  # Monthly interest rate
     n = int(years * 12)  # Total number of months (ensure it's an integer)
@@ -5,17 +9,18 @@ def calculate_emi(principal, annual_rate, years):
     if r == 0:
         monthly_payment = principal / n  # If interest rate is zero
     else:
-        monthly_payment = (principal * r * (1 + r) ** n) / ((1 + r) ** n - 1)
+        growth = growth_factor(r, n)
+        monthly_payment = (principal * r * growth) / (growth - 1)
     
     return monthly_payment, n  # Return n as well to use it in cash flow
 
 def npv(rate, cash_flows):
     """Calculate Net Present Value for a given rate"""
-    return sum(cash_flow / ((1 + rate) ** i) for i, cash_flow in enumerate(cash_flows, start=1))
+    return engine.npv(rate, cash_flows, start=1)
 
 def npv_derivative(rate, cash_flows):
     """Calculate the derivative of NPV for a given rate"""
-    return sum(-i * cash_flow / ((1 + rate) ** (i + 1)) for i, cash_flow in enumerate(cash_flows, start=1))
+    return engine.npv_and_derivative(rate, cash_flows, start=1)[1]
 
 def calculate_irr_newton_raphson(principal, monthly_payment, years, guess=0.01, max_iterations=1000, tolerance=1e-6):
     """Calculate IRR using the Newton-Raphson method"""
@@ -23,18 +28,9 @@ def calculate_irr_newton_raphson(principal, monthly_payment, years, guess=0.01,
     # Build the cash flow array: -principal (initial outflow) and monthly EMI for each month
     cash_flows = [-principal] + [monthly_payment] * n
 
-    rate = guess
-    for _ in range(max_iterations):
-        f = npv(rate, cash_flows)
-        df = npv_derivative(rate, cash_flows)
-        if df == 0:
-            return None  # Avoid division by zero
-        new_rate = rate - f / df
-        if abs(new_rate - rate) < tolerance:
-            return new_rate
-        rate = new_rate
-
-    return None  # IRR could not be calculated within the given iterations
+    # Fused NPV/derivative Newton steps, with a Brent fallback on divergence
+    rate, _ = engine.solve_irr(cash_flows, guess=guess, tolerance=tolerance, max_iterations=max_iterations)
+    return rate
 
 def main():
     principal = float(input("Enter loan amount: "))
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from calculations.engine import irr, irr_batch, npv, npv_and_derivative, percent, solve_batch, solve_irr
+
+
+def _cashflows(n_rows=200, seed=7):
+    # Loans and leases of mixed size, rate and tenure, some with a residual
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_rows):
+        principal = rng.uniform(1e4, 1e7)
+        rate = rng.uniform(0.001, 0.03)
+        periods = int(rng.integers(1, 481))
+        emi = principal * rate / (1 - (1 + rate) ** -periods)
+        flows = [-principal] + [emi] * periods
+        flows[-1] += rng.choice([0.0, principal * 0.1])
+        rows.append(flows)
+    return rows
+
+
+def test_npv_derivative_matches_finite_difference():
+    flows = _cashflows(1)[0]
+    value, derivative = npv_and_derivative(0.01, flows)
+    h = 1e-7
+    assert value == pytest.approx(npv(0.01, flows), rel=1e-9, abs=1e-6)
+    assert derivative == pytest.approx((npv(0.01 + h, flows) - npv(0.01 - h, flows)) / (2 * h), rel=1e-5)
+
+
+def test_irr_batch_matches_scalar_irr():
+    rows = _cashflows()
+    rates, converged = irr_batch(rows)
+    assert converged.all()
+    for rate, flows in zip(rates, rows):
+        assert rate == pytest.approx(irr(flows), rel=1e-9, abs=1e-12)
+
+
+def test_irr_batch_flags_rows_without_a_root():
+    rates, converged = irr_batch([[-100, 50, 60], [100, 10, 10]])
+    assert converged.tolist() == [True, False]
+    assert np.isnan(rates[1])
+
+
+def test_solve_batch_matches_scalar_irr():
+    rows = _cashflows(50, seed=11)
+    padded = np.zeros((len(rows), max(map(len, rows))))
+    for i, flows in enumerate(rows):
+        padded[i, :len(flows)] = flows
+
+    def evaluate(x, active):
+        values = [npv_and_derivative(r, padded[i]) for r, i in zip(x.tolist(), active.tolist())]
+        return np.array([v for v, _ in values]), np.array([d for _, d in values])
+
+    roots, converged = solve_batch(evaluate, len(rows), (0.00001, 1), guess=0.01)
+    assert converged.all()
+    for root, flows in zip(roots, rows):
+        assert root == pytest.approx(irr(flows), rel=1e-9, abs=1e-12)
+
+
+def test_solve_irr_accepts_numpy_guess():
+    flows = _cashflows(1)[0]
+    rate, _ = solve_irr(flows, guess=np.float64(0.01))
+    assert type(rate) is float
+    assert rate == pytest.approx(irr(flows), rel=1e-12)
+
+
+def test_percent_has_no_negative_zero():
+    assert str(percent(-1e-9)) == '0.0'
+    assert percent(0.0123456) == 1.23
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from calculations.fixedpoint import (ROUNDING, level_payment_paise, periodic_rate, price_quote_paise, round_div,
+                                     schedule_paise, to_paise)
+from calculations.quote import contract_terms, parse_inputs
+
+CONTRACTS = (('loan', 'standard'), ('loan', 'bullet'), ('loan', 'equal_principal'), ('lease', 'standard'))
+CASES = list(itertools.product(
+    ('100000', '2500000.75', '99999999.99'), ('0.5', '9.75', '18.1234'), ('7', '60', '360'), ('0', '18'),
+    CONTRACTS, ('0', '10000.01'), ('monthly', 'quarterly'), ROUNDING
+))
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_schedule_closes_to_zero(case):
+    amount, rate, tenure, gst_rate, (loan_or_lease, loan_type), residual, frequency, rounding = case
+    inputs = parse_inputs({
+        'loan_amount': amount, 'interest_rate': rate, 'loan_tenure': tenure, 'gst_rate': gst_rate,
+        'loan_or_lease': loan_or_lease, 'loan_type': loan_type, 'residual_value': residual,
+        'payment_frequency': frequency
+    })
+    quote = price_quote_paise(inputs, rounding)
+    payment, principal, interest, balance = schedule_paise(quote['schedule'])
+
+    lent = to_paise(inputs['amount'] if loan_or_lease == 'lease' else contract_terms(inputs)['financed_amount'],
+                    rounding)
+    assert balance[-1] == 0
+    assert int(principal.sum()) == lent
+    assert np.array_equal(balance, lent - np.cumsum(principal))
+    extra = np.zeros(len(payment), dtype=np.int64)
+    extra[-1] = to_paise(inputs['residual_value'], rounding)
+    assert np.array_equal(payment, principal + interest + extra)
+    assert to_paise(quote['total_payment']) == int(payment.sum())
+
+
+def test_round_div_rules():
+    assert [round_div(n, 2, 'half_up') for n in (1, 3, 5, -1, -3)] == [1, 2, 3, -1, -2]
+    assert [round_div(n, 2, 'half_even') for n in (1, 3, 5, -1, -3)] == [0, 2, 2, 0, -2]
+    assert round_div(np.array([7, 8, 9]), 4).tolist() == [2, 2, 2]
+
+
+def test_to_paise_rounds_halves():
+    assert to_paise(0.125, 'half_up') == 13
+    assert to_paise(0.125, 'half_even') == 12
+    assert to_paise([1.005, 2.675], 'half_up').tolist() == [101, 268]
+
+
+def test_level_payment_is_exactly_rounded():
+    rate = periodic_rate(9.5)
+    emi = level_payment_paise(100000000, rate, 60)
+    a, b = rate
+    exact = 100000000 * a * (a + b) ** 60 / (b * ((a + b) ** 60 - b ** 60))
+    assert abs(emi - exact) <= 0.5
+
+
+def test_periodic_rate_rejects_excess_decimals():
+    with pytest.raises(ValueError):
+        periodic_rate(9.12345)
@@ -0,0 +1,62 @@
+import itertools
+import math
+
+import pytest
+
+from calculations.lease import LeaseRequest, parse_lease_inputs, price_lease, price_lease_batch
+
+FORMS = [
+    {
+        'asset_cost': '500000', 'interest_rate': rate, 'tenure_months': tenure, 'moratorium': moratorium,
+        'security_deposit_pct': '5', 'residual_pct': residual, 'advance_rentals': advance,
+        'upfront_fee_pct': '1.5', 'supplier_discount_pct': '2', 'payment_frequency': frequency,
+        'loan_or_lease': loan_or_lease, 'loan_type': loan_type
+    }
+    for rate, tenure, moratorium, residual, advance, frequency, (loan_or_lease, loan_type) in itertools.product(
+        ('0', '8.5', '14'), ('12', '36', '60'), ('0', '3'), ('0', '10'), ('0', '2', '40'), ('monthly', 'quarterly'),
+        (('lease', 'standard'), ('loan', 'standard'), ('loan', 'bullet'))
+    )
+]
+
+
+def _scalar(params):
+    try:
+        return price_lease(params)
+    except (ValueError, ZeroDivisionError) as e:
+        return {'error': str(e)}
+
+
+def test_batch_matches_price_lease():
+    params = [parse_lease_inputs(form) for form in FORMS]
+    batch = price_lease_batch(params)
+    priced = 0
+    for i, p in enumerate(params):
+        quote = _scalar(p)
+        if 'error' in quote:
+            assert batch['error'][i] is not None
+            continue
+        priced += 1
+        assert batch['error'][i] is None
+        assert batch['emi'][i] == quote['emi']
+        assert batch['total_payment'][i] == pytest.approx(quote['total_payment'], abs=1e-6)
+        for name in ('irr_periodic', 'irr_monthly', 'irr_annual'):
+            if quote[name] is None:
+                assert math.isnan(batch[name][i])
+            else:
+                assert batch[name][i] == pytest.approx(quote[name], rel=1e-9, abs=1e-12)
+    assert priced > len(params) // 2
+
+
+def test_batch_accepts_lease_requests_and_broadcast_columns():
+    requests = [LeaseRequest(asset_cost=cost, rate=9.0, tenure_months=36) for cost in (1e5, 2e5, 3e5)]
+    by_request = price_lease_batch(requests)
+    by_column = price_lease_batch({'asset_cost': [1e5, 2e5, 3e5], 'rate': 9.0, 'tenure_months': 36})
+    assert by_request['emi'].tolist() == by_column['emi'].tolist()
+    assert by_request['emi'].tolist() == [r.price()['emi'] for r in requests]
+
+
+def test_zero_rate_irr_is_not_negative_zero():
+    quote = price_lease(parse_lease_inputs({'asset_cost': '500000', 'interest_rate': '0', 'tenure_months': '12',
+                                            'loan_or_lease': 'loan', 'supplier_discount_pct': '5'}))
+    assert quote['irr_periodic'] < 0
+    assert str(quote['irr_monthly']) == str(quote['irr_annual']) == '0.0'
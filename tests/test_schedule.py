@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from calculations.quote import contract_terms, iter_schedule_rows, parse_inputs, price_quote
+
+# The row-by-row schedules of the original app.index, kept as the reference
+# the column schedules must reproduce to the cent.
+
+
+def baseline_schedule(amount, rate, tenure, gst_rate, loan_or_lease, loan_type, residual_value, payment_frequency):
+    financed = amount * (1 + gst_rate / 100)
+    freq_factor = 1 if payment_frequency == 'monthly' else 3
+    r = rate / (12 * 100 / freq_factor)
+    n = tenure // freq_factor
+    table = []
+    cashflows = [-financed]
+
+    if loan_or_lease == 'lease' or loan_type == 'standard':
+        principal_base = amount if loan_or_lease == 'lease' else financed
+        emi = round((principal_base * r) / (1 - (1 + r) ** -n), 2)
+        balance = principal_base
+        for month in range(1, n + 1):
+            interest = round(balance * r, 2)
+            principal = round(emi - interest, 2)
+            balance = round(balance - principal, 2)
+            payment = emi + residual_value if month == n and residual_value else emi
+            table.append((month * freq_factor, payment, principal, interest, max(balance, 0)))
+            cashflows.append(payment)
+    elif loan_type == 'bullet':
+        interest_payment = round(financed * r, 2)
+        for month in range(1, n + 1):
+            if month < n:
+                payment, principal = interest_payment, 0
+            else:
+                principal = financed
+                payment = round(interest_payment + principal + residual_value, 2)
+            table.append((month * freq_factor, payment, principal, interest_payment, max(financed - principal, 0)))
+            cashflows.append(payment)
+    else:
+        principal_const = round(financed / n, 2)
+        balance = financed
+        for month in range(1, n + 1):
+            interest = round(balance * r, 2)
+            payment = round(principal_const + interest, 2)
+            if month == n and residual_value:
+                payment += residual_value
+            balance = round(balance - principal_const, 2)
+            table.append((month * freq_factor, payment, principal_const, interest, max(balance, 0)))
+            cashflows.append(payment)
+    return np.array(table, dtype=float).reshape(-1, 5), np.array(cashflows)
+
+
+CONTRACTS = (('loan', 'standard'), ('loan', 'bullet'), ('loan', 'equal_principal'), ('lease', 'standard'))
+CASES = list(itertools.product(
+    (100000, 2500000.75), (0.5, 9.5, 24), (12, 61, 360), (0, 18), CONTRACTS, (0, 10000), ('monthly', 'quarterly')
+))
+
+
+def _form(amount, rate, tenure, gst_rate, contract, residual_value, payment_frequency):
+    return {
+        'loan_amount': str(amount), 'interest_rate': str(rate), 'loan_tenure': str(tenure),
+        'gst_rate': str(gst_rate), 'loan_or_lease': contract[0], 'loan_type': contract[1],
+        'residual_value': str(residual_value), 'payment_frequency': payment_frequency
+    }
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_column_schedule_matches_baseline_rows(case):
+    amount, rate, tenure, gst_rate, contract, residual_value, payment_frequency = case
+    inputs = parse_inputs(_form(*case))
+    expected, expected_flows = baseline_schedule(amount, rate, tenure, gst_rate, *contract, residual_value,
+                                                 payment_frequency)
+    schedule = price_quote(inputs)['schedule']
+
+    assert np.column_stack(schedule.columns()) == pytest.approx(expected, abs=0.005)
+    flows = schedule.cashflows(-contract_terms(inputs)['financed_amount'])
+    assert flows == pytest.approx(expected_flows, abs=0.005)
+
+
+@pytest.mark.parametrize('case', CASES[::7])
+def test_streamed_rows_match_column_schedule(case):
+    inputs = parse_inputs(_form(*case))
+    rows = np.array(list(iter_schedule_rows(inputs)), dtype=float)
+    schedule = price_quote(inputs)['schedule']
+    assert rows.tolist() == np.column_stack(schedule.columns()).tolist()
+
+
+def test_schedule_columns_are_contiguous_and_counted():
+    schedule = price_quote(parse_inputs(_form(*CASES[0])))['schedule']
+    for column in schedule.columns()[2:]:
+        assert column.flags.c_contiguous and column.base is None
@@ -0,0 +1,86 @@
+import threading
+
+import numpy as np
+import pytest
+
+from calculations.lease import parse_lease_inputs, price_lease
+from calculations.quote import parse_inputs, price_quote
+from calculations.schedule import Schedule
+from calculations.store import QuoteStore
+
+INPUTS = parse_inputs({'loan_amount': '2500000', 'interest_rate': '9.5', 'loan_tenure': '60', 'gst_rate': '18',
+                       'residual_value': '10000'})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return QuoteStore(str(tmp_path))
+
+
+def _assert_same_schedule(stored, schedule):
+    assert isinstance(stored, Schedule)
+    for got, expected in zip(stored.columns(), schedule.columns()):
+        assert np.array_equal(got, expected)
+    assert np.array_equal(stored.cashflows(), schedule.cashflows())
+    assert (stored.installment, stored.label) == (schedule.installment, schedule.label)
+
+
+def test_quote_round_trip(store):
+    quote = price_quote(INPUTS)
+    store.put('quote', INPUTS, quote)
+    stored = store.get('quote', INPUTS)
+    _assert_same_schedule(stored['schedule'], quote['schedule'])
+    assert {k: v for k, v in stored.items() if k != 'schedule'} == \
+        {k: v for k, v in quote.items() if k != 'schedule'}
+    assert store.get('quote', dict(INPUTS, tenure=61)) is None
+    assert (store.hits, store.misses, len(store)) == (1, 1, 1)
+
+
+def test_empty_schedule_round_trip(store):
+    empty = Schedule([], [], [], [], [], installment=0.0, initial=-1000.0)
+    store.put('quote', INPUTS, {'result': 'empty', 'installment': 0.0, 'schedule': empty})
+    stored = store.get('quote', INPUTS)['schedule']
+    assert len(stored) == 0
+    _assert_same_schedule(stored, empty)
+
+
+@pytest.mark.parametrize('loan_or_lease', ['lease', 'loan'])
+def test_lease_round_trip(store, loan_or_lease):
+    params = parse_lease_inputs({'asset_cost': '500000', 'interest_rate': '10', 'tenure_months': '24',
+                                 'advance_rentals': '2', 'residual_pct': '10', 'loan_or_lease': loan_or_lease})
+    quote = price_lease(params)
+    store.put('lease', params, quote)
+    stored = store.get('lease', params)
+    assert np.array_equal(stored['cashflows'], quote['cashflows'])
+    assert stored['irr_annual'] == quote['irr_annual']
+    if isinstance(quote['table'], Schedule):
+        _assert_same_schedule(stored['table'], quote['table'])
+    else:
+        assert stored['table'] == []
+
+
+def test_get_or_compute_prices_once(tmp_path):
+    store = QuoteStore(str(tmp_path))
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        return price_quote(INPUTS)
+
+    def worker():
+        barrier.wait()
+        store.get_or_compute('quote', INPUTS, compute)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert QuoteStore(str(tmp_path)).get('quote', INPUTS) is not None
+
+
+def test_put_rejects_quotes_without_arrays(store):
+    with pytest.raises(ValueError):
+        store.put('quote', INPUTS, {'result': 'x', 'schedule': None})